@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
-from Bio import SeqIO
+import argparse
 import csv
 import os
+from itertools import islice
 from pathlib import Path
+from Bio import SeqIO
 
 root = Path(__file__).resolve().parent.parent
 script_dir = Path(__file__).resolve().parent
@@ -11,18 +13,37 @@ project_root = script_dir.parent.parent
 fasta_file = project_root / "00_input" / "annotated_denv_genomes_nm.fasta"
 table_file = project_root / "00_input" / "recomb_and_parents.csv"
 output_dir = root / "results" / "fragments"
-alignment_length = 15213
 
-# ==== CREATE OUTPUT DIR ====
-os.makedirs(output_dir, exist_ok=True)
 
-# ==== LOAD FASTA ====
-seq_dict = {rec.id: rec for rec in SeqIO.parse(fasta_file, "fasta")}
+def load_sequences(fasta_path, low_memory=False):
+    """
+    Load an annotated genome FASTA into a {id: SeqRecord} dict.
+
+    With low_memory=True only record offsets are kept (Bio.SeqIO.index) and
+    each record is parsed from disk when accessed.
+    """
+    if low_memory:
+        return SeqIO.index(str(fasta_path), "fasta")
+    return {rec.id: rec for rec in SeqIO.parse(str(fasta_path), "fasta")}
+
+
+def load_events(table_path):
+    """Read the recombination event table (one dict per event)."""
+    with open(table_path, newline='') as csvfile:
+        return list(csv.DictReader(csvfile, delimiter=","))
 
-# ==== READ TABLE AND PROCESS ====
-with open(table_file, newline='') as csvfile:
-    reader = csv.DictReader(csvfile, delimiter=",")
-    for row in reader:
+
+def generate_fragments(seq_dict, events, output_dir, alignment_length=None):
+    """
+    Write the per-event snipit inputs (full, frag1 and frag2_outside FASTAs).
+
+    The outside fragment runs to `alignment_length` (default: the end of each
+    sequence). Returns the list of fragment FASTA paths written, in event order.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+
+    for row in events:
         recombinant = row["Recombinant"].strip()
         minor = row["Minor parent"].strip()
         major = row["Major parent"].strip()
@@ -43,6 +64,7 @@ with open(table_file, newline='') as csvfile:
         out_fasta_path = os.path.join(output_dir, f"{base_name}.fasta")
 
         SeqIO.write([seq_dict[t] for t in taxa], out_fasta_path, "fasta")
+        written.append(Path(out_fasta_path))
 
         frag1_records = []
         for t in taxa:
@@ -53,6 +75,7 @@ with open(table_file, newline='') as csvfile:
 
         frag1_path = os.path.join(output_dir, f"{base_name}_frag1_{begin}_{end}.fasta")
         SeqIO.write(frag1_records, frag1_path, "fasta")
+        written.append(Path(frag1_path))
 
         frag2_records = []
         for t in taxa:
@@ -63,6 +86,55 @@ with open(table_file, newline='') as csvfile:
 
         frag2_path = os.path.join(output_dir, f"{base_name}_frag2_outside_{begin}_{end}.fasta")
         SeqIO.write(frag2_records, frag2_path, "fasta")
-
-print("Done.")
-
+        written.append(Path(frag2_path))
+
+    return written
+
+
+def generate_fragments_chunked(seq_index, events, output_dir, block_size=100, alignment_length=None):
+    """
+    Same output as generate_fragments for a lazy `seq_index`
+    (load_sequences(..., low_memory=True)).
+
+    Events are processed in blocks of `block_size`; only the taxa of the
+    current block are parsed and held in memory.
+    """
+    written = []
+    events = iter(events)
+    while True:
+        block = list(islice(events, block_size))
+        if not block:
+            break
+        taxa = {row[col].strip() for row in block for col in ("Recombinant", "Minor parent", "Major parent")}
+        block_dict = {t: seq_index[t] for t in taxa if t in seq_index}
+        written.extend(generate_fragments(block_dict, block, output_dir, alignment_length))
+    return written
+
+
+def main():
+    p = argparse.ArgumentParser(description="Write snipit fragment FASTAs for each recombination event")
+    p.add_argument("--fasta", type=Path, default=fasta_file, help="Annotated genome FASTA")
+    p.add_argument("--table", type=Path, default=table_file, help="Recombination event table (CSV)")
+    p.add_argument("--outdir", type=Path, default=output_dir, help="Fragment output directory")
+    p.add_argument("--alignment-length", type=int, default=None,
+                   help="Alignment length (default: length of each sequence)")
+    p.add_argument("--block-size", type=int, default=0,
+                   help="Process events in blocks of this size without loading the whole FASTA (0 = off)")
+    args = p.parse_args()
+
+    events = load_events(args.table)
+    if args.block_size:
+        seq_index = load_sequences(args.fasta, low_memory=True)
+        try:
+            generate_fragments_chunked(seq_index, events, args.outdir, args.block_size, args.alignment_length)
+        finally:
+            seq_index.close()
+    else:
+        seq_dict = load_sequences(args.fasta)
+        generate_fragments(seq_dict, events, args.outdir, args.alignment_length)
+
+    print("Done.")
+
+
+if __name__ == "__main__":
+    main()
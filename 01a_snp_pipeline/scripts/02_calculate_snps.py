@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 
+import argparse
 import csv
+import importlib
 from pathlib import Path
 
 # =========================
@@ -13,9 +15,12 @@ PIPELINE_ROOT = SCRIPT_DIR.parent.parent
 INPUT_FILE = PIPELINE_ROOT / "00_input" / "recomb_and_parents.csv"
 OUTPUT_FILE = PIPELINE_ROOT / "01a_snp_pipeline" / "results" / "recombinant_snps.csv"
 
-SNIPIT_OUTPUTS_DIR = Path("/scratch/cenapadrjsd/hugo.oliveira2/hpc-flavirecomb/01a_snp_pipeline/results/snipit_outputs")
+SNIPIT_OUTPUTS_DIR = PIPELINE_ROOT / "01a_snp_pipeline" / "results" / "snipit_outputs"
 FRAGMENTS_DIR = PIPELINE_ROOT / "01a_snp_pipeline" / "results" / "fragments"
 
+auto_snipit = importlib.import_module("00_auto_snipit")
+mismatch_index = importlib.import_module("mismatch_index")
+
 # =========================
 # Helpers
 # =========================
@@ -52,76 +57,109 @@ def fasta_length(fasta_path):
     return length
 
 # =========================
-# Load input
-# =========================
-
-rows = read_csv_dict(INPUT_FILE)
-
-for row in rows:
-    row["SNPs (in recombinant region)"] = ""
-    row["SNPs (in non-recombinant region)"] = ""
-    row["Recombinant Length (bp)"] = "0"
-    row["Non-Recombinant Length (bp)"] = "0"
-
-# =========================
-# Main loop
-# =========================
-
-for row in rows:
-    recombinant = row["Recombinant"].strip()
-    minor = normalize_parent(row["Minor parent"])
-    major = normalize_parent(row["Major parent"])
-
-    prefix = f"snipit_{recombinant}_{minor}_{major}"
-
-    minor_snps = 0
-    major_snps = 0
-    rec_len = 0
-    nonrec_len = 0
-
-    for subdir in SNIPIT_OUTPUTS_DIR.iterdir():
-        if not subdir.is_dir():
-            continue
-        name = subdir.name
-
-        if not name.startswith(prefix):
-            continue
-
-        if "_frag1_" in name:
-            snps_csv = subdir / "snps.csv"
-            fasta = FRAGMENTS_DIR / f"{name}.fasta"
-
-            if snps_csv.exists():
-                minor_snps += read_snps(snps_csv, minor)
-            if fasta.exists():
-                rec_len += fasta_length(fasta)
-
-        elif "_frag2_outside_" in name:
-            snps_csv = subdir / "snps.csv"
-            fasta = FRAGMENTS_DIR / f"{name}.fasta"
-
-            if snps_csv.exists():
-                major_snps += read_snps(snps_csv, major)
-            if fasta.exists():
-                nonrec_len += fasta_length(fasta)
-
-    rec_pct = (minor_snps / rec_len * 100) if rec_len > 0 else 0
-    nonrec_pct = (major_snps / nonrec_len * 100) if nonrec_len > 0 else 0
-
-    row["SNPs (in recombinant region)"] = f"{minor_snps} ({rec_pct:.2f}%)"
-    row["SNPs (in non-recombinant region)"] = f"{major_snps} ({nonrec_pct:.2f}%)"
-    row["Recombinant Length (bp)"] = str(rec_len)
-    row["Non-Recombinant Length (bp)"] = str(nonrec_len)
-
-# =========================
-# Write output
+# Steps
 # =========================
 
-OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-
-with open(OUTPUT_FILE, "w", newline="") as f:
-    writer = csv.DictWriter(f, fieldnames=rows[0].keys())
-    writer.writeheader()
-    writer.writerows(rows)
-
-print(f"SNP results written to: {OUTPUT_FILE}")
+def calculate_snps(events, snipit_outputs_dir=SNIPIT_OUTPUTS_DIR, fragments_dir=FRAGMENTS_DIR, index=None):
+    """
+    Summarise snipit outputs per recombination event.
+
+    `events` is the event table (list of dicts); a new list of rows with the
+    SNP and length columns appended is returned, the input is left untouched.
+    With a mismatch_index `index`, region lengths come from its prefix sums
+    instead of re-reading the fragment FASTAs.
+    """
+    snipit_outputs_dir = Path(snipit_outputs_dir)
+    fragments_dir = Path(fragments_dir)
+    rows = [dict(row) for row in events]
+
+    for row in rows:
+        recombinant = row["Recombinant"].strip()
+        minor = normalize_parent(row["Minor parent"])
+        major = normalize_parent(row["Major parent"])
+
+        prefix = f"snipit_{recombinant}_{minor}_{major}"
+
+        minor_snps = 0
+        major_snps = 0
+        rec_len = 0
+        nonrec_len = 0
+
+        for subdir in snipit_outputs_dir.iterdir():
+            if not subdir.is_dir():
+                continue
+            name = subdir.name
+
+            if not name.startswith(prefix):
+                continue
+
+            if "_frag1_" in name:
+                snps_csv = subdir / "snps.csv"
+                fasta = fragments_dir / f"{name}.fasta"
+
+                if snps_csv.exists():
+                    minor_snps += read_snps(snps_csv, minor)
+                if index is None and fasta.exists():
+                    rec_len += fasta_length(fasta)
+
+            elif "_frag2_outside_" in name:
+                snps_csv = subdir / "snps.csv"
+                fasta = fragments_dir / f"{name}.fasta"
+
+                if snps_csv.exists():
+                    major_snps += read_snps(snps_csv, major)
+                if index is None and fasta.exists():
+                    nonrec_len += fasta_length(fasta)
+
+        if index is not None:
+            _, _, rec_len, nonrec_len = mismatch_index.event_counts(
+                index, recombinant, minor, major, int(row["Begin"]), int(row["End"])
+            )
+            rec_len, nonrec_len = int(rec_len), int(nonrec_len)
+
+        rec_pct = (minor_snps / rec_len * 100) if rec_len > 0 else 0
+        nonrec_pct = (major_snps / nonrec_len * 100) if nonrec_len > 0 else 0
+
+        row["SNPs (in recombinant region)"] = f"{minor_snps} ({rec_pct:.2f}%)"
+        row["SNPs (in non-recombinant region)"] = f"{major_snps} ({nonrec_pct:.2f}%)"
+        row["Recombinant Length (bp)"] = str(rec_len)
+        row["Non-Recombinant Length (bp)"] = str(nonrec_len)
+
+    return rows
+
+
+def write_snp_table(rows, output_file=OUTPUT_FILE):
+    output_file = Path(output_file)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(output_file, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=rows[0].keys())
+        writer.writeheader()
+        writer.writerows(rows)
+
+    return output_file
+
+
+def main():
+    p = argparse.ArgumentParser(description="Summarise snipit SNP counts per recombination event")
+    p.add_argument("--table", type=Path, default=INPUT_FILE, help="Recombination event table (CSV)")
+    p.add_argument("--snipit-outputs", type=Path, default=SNIPIT_OUTPUTS_DIR, help="snipit outputs directory")
+    p.add_argument("--fragments", type=Path, default=FRAGMENTS_DIR, help="Fragment FASTA directory")
+    p.add_argument("--output", type=Path, default=OUTPUT_FILE, help="Output CSV")
+    p.add_argument("--fasta", type=Path, default=None,
+                   help="Annotated genome FASTA; region lengths then come from prefix sums "
+                        "instead of scanning the fragment FASTAs")
+    args = p.parse_args()
+
+    events = read_csv_dict(args.table)
+    index = None
+    if args.fasta:
+        index = mismatch_index.build_index(auto_snipit.load_sequences(args.fasta), events)
+    rows = calculate_snps(events, args.snipit_outputs, args.fragments, index)
+    output_file = write_snp_table(rows, args.output)
+
+    print(f"SNP results written to: {output_file}")
+
+
+if __name__ == "__main__":
+    main()
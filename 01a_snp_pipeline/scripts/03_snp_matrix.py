@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Per-site SNP matrix for all recombination events.
+
+One row per (event, taxon, alignment position, ref base, alt base), where the
+reference is the recombinant and the taxa are its minor/major parents, like
+the snipit runs. Sites where either base is a gap or ambiguity code are not
+counted (snipit default). Positions are 1-based alignment columns and each
+row is tagged with the region it falls in (1 = Begin..End, 0 = outside).
+
+The matrix is stored column by column in a compressed .npz, so a downstream
+analysis only loads the arrays (and events) it asks for:
+
+    event, taxon, position, ref, alt, region   one entry per SNP
+    events                                     "Recombinant" of each event
+    begin, end                                 event breakpoints
+    taxa                                       taxon names (taxon indexes this)
+"""
+import argparse
+import csv
+import importlib
+from pathlib import Path
+import numpy as np
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PIPELINE_ROOT = SCRIPT_DIR.parent.parent
+
+auto_snipit = importlib.import_module("00_auto_snipit")
+
+OUTPUT_FILE = PIPELINE_ROOT / "01a_snp_pipeline" / "results" / "snp_matrix.npz"
+DENSITY_FILE = PIPELINE_ROOT / "01a_snp_pipeline" / "results" / "snp_density.csv"
+
+COLUMNS = ("event", "taxon", "position", "ref", "alt", "region")
+
+BASES = np.zeros(256, dtype=bool)
+BASES[np.frombuffer(b"ACGT", dtype=np.uint8)] = True
+
+
+def as_array(seq):
+    """Upper-case sequence as a uint8 array (one byte per alignment column)."""
+    return np.frombuffer(str(seq).upper().encode("ascii"), dtype=np.uint8)
+
+
+def build_snp_matrix(seq_dict, events):
+    """
+    Compare each recombinant against its known parents, all events at once.
+
+    Returns a dict of column arrays (see module docstring).
+    """
+    taxa = []
+    taxon_index = {}
+    columns = {name: [] for name in COLUMNS}
+    names, begins, ends = [], [], []
+
+    for row in events:
+        recombinant = row["Recombinant"].strip()
+        begin = int(row["Begin"])
+        end = int(row["End"])
+        event_id = len(names)
+        names.append(recombinant)
+        begins.append(begin)
+        ends.append(end)
+
+        if recombinant not in seq_dict:
+            print(f"Warning: Missing sequence for {recombinant}, skipping event.")
+            continue
+        ref = as_array(seq_dict[recombinant].seq)
+
+        for parent in (row["Minor parent"].strip(), row["Major parent"].strip()):
+            if parent == "Unknown" or parent not in seq_dict:
+                continue
+            alt = as_array(seq_dict[parent].seq)
+            n = min(len(ref), len(alt))
+            r, a = ref[:n], alt[:n]
+            idx = np.flatnonzero((r != a) & BASES[r] & BASES[a])
+            position = idx + 1
+
+            if parent not in taxon_index:
+                taxon_index[parent] = len(taxa)
+                taxa.append(parent)
+
+            columns["event"].append(np.full(idx.size, event_id, dtype=np.int32))
+            columns["taxon"].append(np.full(idx.size, taxon_index[parent], dtype=np.int32))
+            columns["position"].append(position.astype(np.int32))
+            columns["ref"].append(r[idx])
+            columns["alt"].append(a[idx])
+            columns["region"].append(((position >= begin) & (position <= end)).astype(np.int8))
+
+    dtypes = {"event": np.int32, "taxon": np.int32, "position": np.int32,
+              "ref": np.uint8, "alt": np.uint8, "region": np.int8}
+    matrix = {
+        name: np.concatenate(parts) if parts else np.empty(0, dtype=dtypes[name])
+        for name, parts in columns.items()
+    }
+    matrix["ref"] = matrix["ref"].view("S1")
+    matrix["alt"] = matrix["alt"].view("S1")
+    matrix["events"] = np.array(names)
+    matrix["begin"] = np.array(begins, dtype=np.int32)
+    matrix["end"] = np.array(ends, dtype=np.int32)
+    matrix["taxa"] = np.array(taxa)
+    return matrix
+
+
+def write_snp_matrix(matrix, output_file=OUTPUT_FILE):
+    output_file = Path(output_file)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(output_file, **matrix)
+    return output_file
+
+
+def load_snp_matrix(path=OUTPUT_FILE, columns=COLUMNS, events=None):
+    """
+    Load only the requested columns, optionally restricted to some events.
+
+    `events` are recombinant names or event indexes; a name selects every
+    event of that recombinant. The lookup arrays (events, begin, end, taxa)
+    are always returned.
+    """
+    with np.load(path) as store:
+        out = {key: store[key] for key in ("events", "begin", "end", "taxa")}
+        rows = None
+        if events is not None:
+            indexes = [e for e in events if isinstance(e, (int, np.integer))]
+            names = [e for e in events if not isinstance(e, (int, np.integer))]
+            unknown = sorted(set(names) - set(out["events"].tolist()))
+            if unknown:
+                raise ValueError(f"Unknown recombinant(s): {', '.join(unknown)}")
+            wanted = np.union1d(indexes, np.flatnonzero(np.isin(out["events"], names)))
+            rows = np.isin(store["event"], wanted)
+        for name in columns:
+            col = store[name]
+            out[name] = col[rows] if rows is not None else col
+    return out
+
+
+def windowed_density(matrix, window=500, length=None):
+    """
+    SNPs per window for every (event, taxon) pair, vectorised with bincount.
+
+    Returns (pairs, window_starts, counts): pairs is an (n, 2) array of
+    (event, taxon), counts an (n, n_windows) array; divide by `window` for the
+    per-site density.
+    """
+    position = matrix["position"]
+    if length is None:
+        length = int(position.max()) if position.size else 0
+    n_windows = max(1, -(-length // window))
+
+    keys = matrix["event"].astype(np.int64) * (len(matrix["taxa"]) + 1) + matrix["taxon"]
+    pairs_keys, inverse = np.unique(keys, return_inverse=True)
+    bins = inverse * n_windows + (position - 1) // window
+    counts = np.bincount(bins, minlength=pairs_keys.size * n_windows).reshape(-1, n_windows)
+
+    pairs = np.column_stack(np.divmod(pairs_keys, len(matrix["taxa"]) + 1))
+    window_starts = np.arange(n_windows) * window + 1
+    return pairs, window_starts, counts
+
+
+def region_counts(matrix, regions):
+    """
+    SNPs per named region (e.g. genes) for every (event, taxon) pair.
+
+    `regions` is a list of (name, start, end), 1-based inclusive, sorted and
+    non-overlapping. Returns (pairs, names, counts) like windowed_density.
+    """
+    names = [r[0] for r in regions]
+    starts = np.array([r[1] for r in regions])
+    ends = np.array([r[2] for r in regions])
+    position = matrix["position"]
+
+    slot = np.searchsorted(starts, position, side="right") - 1
+    inside = (slot >= 0) & (position <= ends[np.clip(slot, 0, None)])
+
+    keys = matrix["event"].astype(np.int64) * (len(matrix["taxa"]) + 1) + matrix["taxon"]
+    pairs_keys, inverse = np.unique(keys, return_inverse=True)
+    bins = inverse[inside] * len(regions) + slot[inside]
+    counts = np.bincount(bins, minlength=pairs_keys.size * len(regions)).reshape(-1, len(regions))
+
+    pairs = np.column_stack(np.divmod(pairs_keys, len(matrix["taxa"]) + 1))
+    return pairs, names, counts
+
+
+def write_density(matrix, output_file=DENSITY_FILE, window=500, length=None):
+    pairs, window_starts, counts = windowed_density(matrix, window, length)
+    output_file = Path(output_file)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(output_file, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Event", "Recombinant", "Begin", "End", "Parent",
+                         "Window start", "Window end", "SNPs", "SNPs per site"])
+        for (event, taxon), row in zip(pairs, counts):
+            for start, c in zip(window_starts, row):
+                writer.writerow([event, matrix["events"][event], matrix["begin"][event], matrix["end"][event],
+                                 matrix["taxa"][taxon], start, start + window - 1, c, f"{c / window:.4f}"])
+
+    return output_file
+
+
+def main():
+    p = argparse.ArgumentParser(description="Per-site SNP matrix (.npz) and windowed SNP density")
+    p.add_argument("--fasta", type=Path, default=auto_snipit.fasta_file, help="Annotated genome FASTA")
+    p.add_argument("--table", type=Path, default=auto_snipit.table_file, help="Recombination event table (CSV)")
+    p.add_argument("--output", type=Path, default=OUTPUT_FILE, help="Output .npz")
+    p.add_argument("--density", type=Path, default=DENSITY_FILE, help="Windowed density CSV")
+    p.add_argument("--window", type=int, default=500, help="Density window size (bp)")
+    p.add_argument("--low-memory", action="store_true",
+                   help="Index the FASTA instead of loading it (only the current event is held)")
+    args = p.parse_args()
+
+    seq_dict = auto_snipit.load_sequences(args.fasta, args.low_memory)
+    matrix = build_snp_matrix(seq_dict, auto_snipit.load_events(args.table))
+    output_file = write_snp_matrix(matrix, args.output)
+    write_density(matrix, args.density, args.window)
+
+    print(f"SNP matrix ({len(matrix['position'])} SNPs) written to: {output_file}")
+
+
+if __name__ == "__main__":
+    main()
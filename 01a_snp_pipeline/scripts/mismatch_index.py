@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Prefix-sum index over the alignment for breakpoint-interval queries.
+
+For every (recombinant, parent) pair we keep the cumulative number of SNPs
+(same rule as 03_snp_matrix: both bases in ACGT and different) and for every
+sequence the cumulative number of non-gap bases, so that for any 1-based
+inclusive interval [b, e]:
+
+    SNPs(b, e)     = cum_mismatch[e] - cum_mismatch[b - 1]
+    ungapped(b, e) = cum_ungapped[e] - cum_ungapped[b - 1]
+
+This gives the recombinant/non-recombinant numbers of 02_calculate_snps without
+writing fragments, and lets sweep_breakpoints() score thousands of candidate
+(Begin, End) pairs per event with array indexing.
+"""
+import argparse
+import csv
+import importlib
+from pathlib import Path
+import numpy as np
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PIPELINE_ROOT = SCRIPT_DIR.parent.parent
+
+auto_snipit = importlib.import_module("00_auto_snipit")
+snp_matrix = importlib.import_module("03_snp_matrix")
+
+OUTPUT_FILE = PIPELINE_ROOT / "01a_snp_pipeline" / "results" / "breakpoint_sweep.csv"
+
+GAPS = np.zeros(256, dtype=bool)
+GAPS[np.frombuffer(b"-.", dtype=np.uint8)] = True
+
+
+def _prefix(mask):
+    cum = np.zeros(mask.size + 1, dtype=np.int32)
+    np.cumsum(mask, out=cum[1:])
+    return cum
+
+
+def mismatch_prefix(ref, alt):
+    """Cumulative SNP count between two uint8 sequence arrays."""
+    n = min(len(ref), len(alt))
+    r, a = ref[:n], alt[:n]
+    return _prefix((r != a) & snp_matrix.BASES[r] & snp_matrix.BASES[a])
+
+
+def ungapped_prefix(seq):
+    """Cumulative count of non-gap ('-' / '.') characters."""
+    return _prefix(~GAPS[seq])
+
+
+def build_index(seq_dict, events):
+    """
+    Build the prefix sums needed by the events.
+
+    Returns {"mismatch": {(recombinant, parent): cum}, "ungapped": {taxon: cum}}.
+    """
+    index = {"mismatch": {}, "ungapped": {}}
+
+    # sequences are only held for the current event, so a lazy seq_dict
+    # (load_sequences(..., low_memory=True)) keeps memory to the prefix sums
+    def array(taxon):
+        seq = snp_matrix.as_array(seq_dict[taxon].seq)
+        if taxon not in index["ungapped"]:
+            index["ungapped"][taxon] = ungapped_prefix(seq)
+        return seq
+
+    for row in events:
+        recombinant = row["Recombinant"].strip()
+        if recombinant not in seq_dict:
+            continue
+        ref = array(recombinant)
+        for parent in (row["Minor parent"].strip(), row["Major parent"].strip()):
+            if parent == "Unknown" or parent not in seq_dict:
+                continue
+            alt = array(parent)
+            if (recombinant, parent) not in index["mismatch"]:
+                index["mismatch"][(recombinant, parent)] = mismatch_prefix(ref, alt)
+
+    return index
+
+
+def interval(cum, begin, end):
+    """Count in [begin, end] (1-based, inclusive); works on scalars or arrays."""
+    end = np.minimum(end, cum.size - 1)
+    return cum[end] - cum[np.asarray(begin) - 1]
+
+
+def outside(cum, begin, end):
+    """Count outside [begin, end]."""
+    return cum[-1] - interval(cum, begin, end)
+
+
+def event_taxa(index, recombinant, minor, major):
+    """
+    Known taxa of an event ("Unknown"/"NA" parents dropped), or None when any
+    of them is not indexed: generate_fragments skips such events.
+    """
+    taxa = [t for t in (recombinant, minor, major) if t not in ("Unknown", "NA")]
+    if not taxa or any(t not in index["ungapped"] for t in taxa):
+        return None
+    return taxa
+
+
+def event_counts(index, recombinant, minor, major, begin, end):
+    """
+    SNPs and ungapped lengths of one event, as 02_calculate_snps reports them.
+
+    Recombinant region: SNPs vs the minor parent; non-recombinant region: SNPs
+    vs the major parent. Lengths are summed over the event's taxa, like
+    fasta_length() on the fragment FASTAs. `begin`/`end` may be arrays.
+    Events with a missing sequence count 0, as they get no fragments.
+    """
+    taxa = event_taxa(index, recombinant, minor, major)
+    if taxa is None:
+        zero = np.zeros_like(np.asarray(begin) + np.asarray(end))
+        return zero, zero, zero, zero
+    rec_len = sum(interval(index["ungapped"][t], begin, end) for t in taxa)
+    nonrec_len = sum(outside(index["ungapped"][t], begin, end) for t in taxa)
+
+    minor_cum = index["mismatch"].get((recombinant, minor))
+    major_cum = index["mismatch"].get((recombinant, major))
+    minor_snps = interval(minor_cum, begin, end) if minor_cum is not None else 0 * rec_len
+    major_snps = outside(major_cum, begin, end) if major_cum is not None else 0 * nonrec_len
+    return minor_snps, major_snps, rec_len, nonrec_len
+
+
+def candidate_breakpoints(begin, end, delta=200, step=10):
+    """All (Begin, End) pairs within +-delta of the reported breakpoints."""
+    offsets = np.arange(-delta, delta + 1, step)
+    begins, ends = np.meshgrid(begin + offsets, end + offsets, indexing="ij")
+    begins, ends = begins.ravel(), ends.ravel()
+    keep = (begins >= 1) & (begins <= ends)
+    return begins[keep], ends[keep]
+
+
+def sweep_breakpoints(index, events, delta=200, step=10):
+    """
+    Score every candidate breakpoint pair of every event.
+
+    Yields one dict of arrays per event (Begin, End, SNP counts, lengths).
+    """
+    for row in events:
+        recombinant = row["Recombinant"].strip()
+        minor = row["Minor parent"].strip()
+        major = row["Major parent"].strip()
+        if event_taxa(index, recombinant, minor, major) is None:
+            continue
+
+        begins, ends = candidate_breakpoints(int(row["Begin"]), int(row["End"]), delta, step)
+        length = index["ungapped"][recombinant].size - 1
+        keep = ends <= length
+        begins, ends = begins[keep], ends[keep]
+
+        minor_snps, major_snps, rec_len, nonrec_len = event_counts(
+            index, recombinant, minor, major, begins, ends
+        )
+        yield {
+            "Recombinant": recombinant,
+            "Minor parent": minor,
+            "Major parent": major,
+            "Begin": begins,
+            "End": ends,
+            "SNPs (in recombinant region)": minor_snps,
+            "SNPs (in non-recombinant region)": major_snps,
+            "Recombinant Length (bp)": rec_len,
+            "Non-Recombinant Length (bp)": nonrec_len,
+        }
+
+
+def write_sweep(sweeps, output_file=OUTPUT_FILE):
+    output_file = Path(output_file)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    fieldnames = ["Recombinant", "Minor parent", "Major parent", "Begin", "End",
+                  "SNPs (in recombinant region)", "SNPs (in non-recombinant region)",
+                  "Recombinant Length (bp)", "Non-Recombinant Length (bp)"]
+
+    with open(output_file, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        for sweep in sweeps:
+            n = sweep["Begin"].size
+            columns = [np.broadcast_to(sweep[name], n) for name in fieldnames]
+            writer.writerows(zip(*columns))
+
+    return output_file
+
+
+def main():
+    p = argparse.ArgumentParser(description="Breakpoint-sensitivity sweep of SNP counts per event")
+    p.add_argument("--fasta", type=Path, default=auto_snipit.fasta_file, help="Annotated genome FASTA")
+    p.add_argument("--table", type=Path, default=auto_snipit.table_file, help="Recombination event table (CSV)")
+    p.add_argument("--output", type=Path, default=OUTPUT_FILE, help="Output CSV")
+    p.add_argument("--delta", type=int, default=200, help="Max shift of Begin/End (bp)")
+    p.add_argument("--step", type=int, default=10, help="Shift step (bp)")
+    p.add_argument("--low-memory", action="store_true", help="Index the FASTA instead of loading it")
+    args = p.parse_args()
+
+    seq_dict = auto_snipit.load_sequences(args.fasta, args.low_memory)
+    events = auto_snipit.load_events(args.table)
+    index = build_index(seq_dict, events)
+    output_file = write_sweep(sweep_breakpoints(index, events, args.delta, args.step), args.output)
+
+    print(f"Breakpoint sweep written to: {output_file}")
+
+
+if __name__ == "__main__":
+    main()
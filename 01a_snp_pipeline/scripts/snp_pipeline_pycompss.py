@@ -1,43 +1,49 @@
+import argparse
+import importlib
 from pathlib import Path
 from pycompss.api.task import task
 from pycompss.api.binary import binary
 from pycompss.api.parameter import FILE_IN
 from pycompss.api.api import compss_barrier
-import subprocess
-import sys
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+RESULTS_DIR = SCRIPT_DIR.parent / "results"
+
+auto_snipit = importlib.import_module("00_auto_snipit")
+calculate = importlib.import_module("02_calculate_snps")
 
 @binary(
-    binary="/scratch/cenapadrjsd/hugo.oliveira2/hpc-flavirecomb/01a_snp_pipeline/scripts/01_run_snipit.sh"
+    binary=str(SCRIPT_DIR / "01_run_snipit.sh")
 )
 @task(fasta=FILE_IN)
 def run_snipit(fasta, out_dir):
     pass
 
-def generate_fragments():
-    """Executa o script 00_auto_snipit.py no master para criar os FASTAs."""
-    script_path = Path("/scratch/cenapadrjsd/hugo.oliveira2/hpc-flavirecomb/01a_snp_pipeline/scripts/00_auto_snipit.py")
-    result = subprocess.run([sys.executable, str(script_path)], check=True)
-    if result.returncode != 0:
-        raise RuntimeError("Falha ao gerar fragmentos FASTA com 00_auto_snipit.py")
+def generate_fragments(fasta_file, table_file, frag_dir):
+    """Gera os FASTAs de fragmentos no master (00_auto_snipit)."""
+    seq_dict = auto_snipit.load_sequences(fasta_file)
+    events = auto_snipit.load_events(table_file)
+    return events, auto_snipit.generate_fragments(seq_dict, events, frag_dir)
 
-def calculate_snps():
-    """Executa o script 02_calculate_snps.py no master para gerar estatísticas de SNPs."""
-    script_path = Path("/scratch/cenapadrjsd/hugo.oliveira2/hpc-flavirecomb/01a_snp_pipeline/scripts/02_calculate_snps.py")
-    result = subprocess.run([sys.executable, str(script_path)], check=True)
-    if result.returncode != 0:
-        raise RuntimeError("Falha ao calcular SNPs com 02_calculate_snps.py")
+def calculate_snps(events, out_root, frag_dir):
+    """Gera as estatísticas de SNPs no master (02_calculate_snps)."""
+    rows = calculate.calculate_snps(events, out_root, frag_dir)
+    return calculate.write_snp_table(rows, RESULTS_DIR / "recombinant_snps.csv")
 
 def main():
+    p = argparse.ArgumentParser(description="SNP pipeline (PyCOMPSs)")
+    p.add_argument("--fasta", type=Path, default=auto_snipit.fasta_file)
+    p.add_argument("--table", type=Path, default=auto_snipit.table_file)
+    args = p.parse_args()
+
     print("MASTER: starting")
-    
-    print("MASTER: generating fragment FASTAs")
-    generate_fragments()
 
-    frag_dir = Path("/scratch/cenapadrjsd/hugo.oliveira2/hpc-flavirecomb/01a_snp_pipeline/results/fragments")
-    out_root = Path("/scratch/cenapadrjsd/hugo.oliveira2/hpc-flavirecomb/01a_snp_pipeline/results/snipit_outputs").resolve()
-    out_root.mkdir(exist_ok=True)
+    frag_dir = RESULTS_DIR / "fragments"
+    out_root = (RESULTS_DIR / "snipit_outputs").resolve()
+    out_root.mkdir(parents=True, exist_ok=True)
 
-    fasta_files = sorted(frag_dir.glob("*.fasta"))
+    print("MASTER: generating fragment FASTAs")
+    events, fasta_files = generate_fragments(args.fasta, args.table, frag_dir)
     print(f"MASTER: found {len(fasta_files)} FASTA files")
 
     for fasta in fasta_files:
@@ -52,7 +58,7 @@ def main():
     print("MASTER: Snipit tasks completed")
 
     print("MASTER: calculating SNP statistics")
-    calculate_snps()
+    calculate_snps(events, out_root, frag_dir)
     print("MASTER: done")
 
 if __name__ == "__main__":
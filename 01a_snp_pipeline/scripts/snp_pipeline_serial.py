@@ -1,23 +1,83 @@
 #!/usr/bin/env python3
+import argparse
+import importlib
 import subprocess
-import os
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+BASE = SCRIPT_DIR.parent.parent
+
+auto_snipit = importlib.import_module("00_auto_snipit")
+calculate = importlib.import_module("02_calculate_snps")
+snp_matrix = importlib.import_module("03_snp_matrix")
+mismatch_index = importlib.import_module("mismatch_index")
+
+SNIPIT_SH = SCRIPT_DIR / "01_run_snipit.sh"
+RESULTS_DIR = BASE / "01a_snp_pipeline" / "results"
 
-BASE = "/home/hugo/hpc_flavirecomb"
 
 def run(cmd):
     print(f"\n=== Running: {cmd} ===")
     subprocess.run(cmd, shell=True, check=True)
 
+
+def run_snipit_jobs(fragments, out_root, runner=run):
+    """Run snipit on each fragment FASTA into out_root/<fragment stem>."""
+    out_root = Path(out_root)
+    out_root.mkdir(parents=True, exist_ok=True)
+    for fasta in fragments:
+        fasta = Path(fasta).resolve()
+        runner(f"bash {SNIPIT_SH} {fasta} {out_root / fasta.stem}")
+    return out_root
+
+
+def run_snp_pipeline(seq_dict, events, results_dir=RESULTS_DIR,
+                     alignment_length=None, runner=run, block_size=0):
+    """
+    Run fragments -> snipit -> SNP summary in-process.
+
+    `seq_dict` and `events` are the already loaded genomes and event table
+    (`seq_dict` may be a lazy index, then use block_size > 0 so fragments are
+    written per block of events); returns the SNP summary rows. The per-site SNP matrix and its windowed
+    density are written next to the summary.
+    """
+    results_dir = Path(results_dir)
+    fragments_dir = results_dir / "fragments"
+    snipit_dir = results_dir / "snipit_outputs"
+
+    if block_size:
+        fragments = auto_snipit.generate_fragments_chunked(seq_dict, events, fragments_dir, block_size,
+                                                           alignment_length)
+    else:
+        fragments = auto_snipit.generate_fragments(seq_dict, events, fragments_dir, alignment_length)
+    run_snipit_jobs(fragments, snipit_dir, runner)
+    index = mismatch_index.build_index(seq_dict, events)
+    rows = calculate.calculate_snps(events, snipit_dir, fragments_dir, index)
+    calculate.write_snp_table(rows, results_dir / "recombinant_snps.csv")
+
+    matrix = snp_matrix.build_snp_matrix(seq_dict, events)
+    snp_matrix.write_snp_matrix(matrix, results_dir / "snp_matrix.npz")
+    snp_matrix.write_density(matrix, results_dir / "snp_density.csv")
+    return rows
+
+
 def main():
+    p = argparse.ArgumentParser(description="SNP pipeline (serial)")
+    p.add_argument("--fasta", type=Path, default=auto_snipit.fasta_file, help="Annotated genome FASTA")
+    p.add_argument("--table", type=Path, default=auto_snipit.table_file, help="Recombination event table (CSV)")
+    p.add_argument("--results", type=Path, default=RESULTS_DIR, help="Results directory")
+    p.add_argument("--block-size", type=int, default=0,
+                   help="Index the FASTA instead of loading it and process events in blocks (0 = off)")
+    args = p.parse_args()
+
     print("=== 00 SNP Pipeline ===")
 
-    run(f"python3 {BASE}/01a_snp_pipeline/scripts/00_auto_snipit.py")
-    run(f"bash {BASE}/01a_snp_pipeline/scripts/01_run_snipit.sh")
-    run(f"python3 {BASE}/01a_snp_pipeline/scripts/02_calculate_snps.py")
+    seq_dict = auto_snipit.load_sequences(args.fasta, low_memory=bool(args.block_size))
+    events = auto_snipit.load_events(args.table)
+    run_snp_pipeline(seq_dict, events, args.results, block_size=args.block_size)
 
     print("\n=== 00 SNP Pipeline Completed ===")
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+partitioned_iqtree.py
+
+One IQ-TREE2 job for the recombinant vs non-recombinant regions of all events:
+  1) build the charsets from the Begin/End of recomb_and_parents.csv
+       - --scheme union (default): "recombinant" = columns inside any event,
+         "non_recombinant" = the rest
+       - --scheme event: one charset per event ("event_<k>_<recombinant>");
+         columns shared by several events go to the first of them in the
+         table; an event left with fewer than --min-length columns joins the
+         event charset next to it (or "recombinant_minor" if there is none);
+         uncovered columns go to "non_recombinant"
+  2) run IQ-TREE once with the partition scheme
+       - default:  -p  (one tree, ModelFinder per region)
+       - --per-region-trees:  -S  (one tree per region, same job/threads)
+  3) split the -S treefile into one Newick per region
+
+Begin/End must be 1-based columns of --alignment: an event outside it is an
+error (the event table of 00_input is in genome-alignment columns, so it only
+fits an alignment with the same columns). A region shorter than --min-length
+columns is an error too, as ModelFinder / a tree on it would be meaningless.
+
+Writes <prefix>_partitions.nex, <prefix>_regions.csv (charset -> columns,
+events) and, with -S, <prefix>_<region>.treefile.
+
+Usage example:
+  python3 partitioned_iqtree.py \
+    --alignment ../data/alignment.fasta \
+    --table ../../00_input/recomb_and_parents.csv \
+    --outdir ./results --prefix regions --per-region-trees --threads 8
+"""
+import argparse
+import csv
+import re
+from pathlib import Path
+import numpy as np
+from Bio import Phylo
+from Bio.SeqIO.FastaIO import SimpleFastaParser
+
+import tree_pipeline
+
+MIN_REGION_LENGTH = 100
+
+def alignment_length(fasta_path: Path):
+    with open(fasta_path) as handle:
+        for _, seq in SimpleFastaParser(handle):
+            return len(seq)
+    raise SystemExit("No sequences found in alignment.")
+
+def load_events(table_path: Path):
+    with open(table_path, newline="") as f:
+        return list(csv.DictReader(f))
+
+def event_spans(events, length: int):
+    """(recombinant, begin, end) of every event; exits if one is outside 1..length."""
+    spans, outside = [], []
+    for row in events:
+        recombinant = row["Recombinant"].strip()
+        begin, end = int(row["Begin"]), int(row["End"])
+        if begin < 1 or end > length or begin > end:
+            outside.append(f"{recombinant} {begin}-{end}")
+        spans.append((recombinant, begin, end))
+    if outside:
+        raise SystemExit(
+            f"{len(outside)} event(s) fall outside the {length}-column alignment "
+            f"(Begin/End must be columns of this alignment): {', '.join(outside)}"
+        )
+    return spans
+
+def column_ranges(mask):
+    """[(start, end), ...] of the runs of True in a column mask (index = 1-based column)."""
+    cols = np.flatnonzero(mask)
+    if not cols.size:
+        return []
+    breaks = np.flatnonzero(np.diff(cols) > 1)
+    starts = np.r_[cols[0], cols[breaks + 1]]
+    ends = np.r_[cols[breaks], cols[-1]]
+    return list(zip(starts.tolist(), ends.tolist()))
+
+def region_length(region):
+    return sum(e - s + 1 for s, e in region["ranges"])
+
+def partition_regions(events, length: int, scheme: str = "union", min_length: int = MIN_REGION_LENGTH):
+    """
+    Split columns 1..length into recombinant / non-recombinant charsets.
+
+    Returns a list of dicts: name, ranges [(start, end), ...] (1-based,
+    inclusive) and events (every event overlapping the region, as
+    "<recombinant>:<Begin>-<End>"). See the module docstring for the schemes.
+    """
+    spans = event_spans(events, length)
+    # owner[c]: -1 = no event, -2 = merged minor events, k = k-th event
+    owner = np.full(length + 1, -1)
+    owner[0] = -3
+    for k, (_, begin, end) in enumerate(spans):
+        window = owner[begin:end + 1]
+        window[window == -1] = -2 if scheme == "union" else k
+
+    regions = []
+    if scheme == "union":
+        regions.append({"name": "recombinant", "ranges": column_ranges(owner == -2)})
+    elif scheme == "event":
+        sizes = np.bincount(owner[owner >= 0], minlength=len(spans))
+        for k in np.flatnonzero((sizes > 0) & (sizes < min_length)):
+            # a sliver joins the event charset right next to it, else recombinant_minor
+            for start, end in column_ranges(owner == k):
+                neighbours = [owner[c] for c in (start - 1, end + 1) if 0 < c <= length]
+                target = next((n for n in neighbours if n >= 0 and sizes[n] >= min_length), -2)
+                owner[start:end + 1] = target
+                if target >= 0:
+                    sizes[target] += end - start + 1
+            sizes[k] = 0
+        for k, (name, _, _) in enumerate(spans):
+            if sizes[k]:
+                safe = re.sub(r"\W", "_", name)
+                regions.append({"name": f"event_{k + 1}_{safe}", "ranges": column_ranges(owner == k)})
+        regions.append({"name": "recombinant_minor", "ranges": column_ranges(owner == -2)})
+    else:
+        raise SystemExit(f"Unknown partition scheme: {scheme}")
+
+    regions.append({"name": "non_recombinant", "ranges": column_ranges(owner == -1)})
+    regions = [r for r in regions if r["ranges"]]
+
+    # every event overlapping a region, including events with no charset of their own
+    for region in regions:
+        mask = np.zeros(length + 1, dtype=bool)
+        for start, end in region["ranges"]:
+            mask[start:end + 1] = True
+        region["events"] = [f"{name}:{begin}-{end}" for name, begin, end in spans if mask[begin:end + 1].any()]
+
+    short = [f"{r['name']} ({region_length(r)} bp)" for r in regions if region_length(r) < min_length]
+    if short:
+        raise SystemExit(f"Region(s) shorter than {min_length} columns: {', '.join(short)}")
+    return regions
+
+def write_partition_nexus(regions, nexus_out: Path):
+    with nexus_out.open("w") as f:
+        f.write("#nexus\nbegin sets;\n")
+        for region in regions:
+            ranges = " ".join(f"{s}-{e}" for s, e in region["ranges"])
+            f.write(f"    charset {region['name']} = {ranges};\n")
+        f.write("end;\n")
+    print(f"Wrote partition scheme: {nexus_out}")
+
+def write_region_table(regions, csv_out: Path):
+    with csv_out.open("w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Region", "Columns", "Length (bp)", "Events"])
+        for region in regions:
+            writer.writerow([
+                region["name"],
+                " ".join(f"{s}-{e}" for s, e in region["ranges"]),
+                region_length(region),
+                " ".join(region["events"]),
+            ])
+
+def split_region_trees(treefile: Path, regions, outdir: Path, prefix: str):
+    """IQ-TREE -S writes one tree per partition, in charset order."""
+    trees = list(Phylo.parse(str(treefile), "newick"))
+    if len(trees) != len(regions):
+        raise SystemExit(f"Expected {len(regions)} trees in {treefile}, found {len(trees)}.")
+    region_trees = {}
+    for region, tree in zip(regions, trees):
+        out = outdir / f"{prefix}_{region['name']}.treefile"
+        Phylo.write(tree, str(out), "newick")
+        region_trees[region["name"]] = tree
+    print(f"Wrote {len(trees)} per-region trees to {outdir}")
+    return region_trees
+
+def run_partitioned_iqtree(alignment: Path, events, outdir: Path, prefix: str = "regions",
+                           iqtree: str = "iqtree2", threads: int = 0, per_region_trees: bool = False,
+                           length: int = None, scheme: str = "union", min_length: int = MIN_REGION_LENGTH,
+                           regions=None, runner=tree_pipeline.run):
+    """
+    Run IQ-TREE once over the region partition scheme of `events`
+    (or over `regions` from partition_regions, when already built).
+
+    Returns {"regions": [...], "tree": joint tree} or, with per_region_trees,
+    {"regions": [...], "trees": {region name: tree}} (Bio.Phylo trees).
+    """
+    alignment = Path(alignment).resolve()
+    outdir = Path(outdir).resolve()
+    outdir.mkdir(parents=True, exist_ok=True)
+    if length is None:
+        length = alignment_length(alignment)
+
+    if regions is None:
+        regions = partition_regions(events, length, scheme, min_length)
+    partitions = outdir / f"{prefix}_partitions.nex"
+    write_partition_nexus(regions, partitions)
+    write_region_table(regions, outdir / f"{prefix}_regions.csv")
+
+    iq_pre = outdir / f"{prefix}_iqtree"
+    p_arg = "-S" if per_region_trees else "-p"
+    nt_arg = "-nt AUTO" if threads == 0 else f"-nt {threads}"
+    iq_cmd = f"{iqtree} -s {alignment} {p_arg} {partitions} -m MFP {nt_arg} -pre {iq_pre} -redo"
+    runner(iq_cmd, cwd=outdir)
+
+    iq_treefile = iq_pre.with_suffix(".treefile")
+    if not iq_treefile.exists():
+        raise SystemExit("IQ-TREE did not produce expected treefile.")
+
+    if per_region_trees:
+        return {"regions": regions, "trees": split_region_trees(iq_treefile, regions, outdir, prefix)}
+    return {"regions": regions, "tree": Phylo.read(str(iq_treefile), "newick")}
+
+def main():
+    p = argparse.ArgumentParser(description="Partitioned IQ-TREE2 run over recombinant / non-recombinant regions")
+    p.add_argument("--alignment", "-s", required=True, type=Path, help="Input MSA FASTA")
+    p.add_argument("--table", required=True, type=Path, help="Recombination event table (recomb_and_parents.csv)")
+    p.add_argument("--outdir", "-od", type=Path, default=Path("."), help="Output directory")
+    p.add_argument("--prefix", "-p", type=str, default="regions", help="Output prefix")
+    p.add_argument("--iqtree-bin", type=str, default="iqtree2", help="IQ-TREE binary (default: iqtree2)")
+    p.add_argument("--threads", "-nt", type=int, default=0, help="Threads for IQ-TREE (0 = AUTO)")
+    p.add_argument("--per-region-trees", action="store_true",
+                   help="Infer one tree per region in the same job (IQ-TREE -S) and split them")
+    p.add_argument("--scheme", choices=["union", "event"], default="union",
+                   help="union: recombinant vs non-recombinant columns; event: one charset per event")
+    p.add_argument("--min-length", type=int, default=MIN_REGION_LENGTH,
+                   help=f"Smallest region allowed, in columns (default: {MIN_REGION_LENGTH})")
+    args = p.parse_args()
+
+    if not args.alignment.exists():
+        raise SystemExit(f"Alignment not found: {args.alignment}")
+
+    run_partitioned_iqtree(
+        args.alignment, load_events(args.table), args.outdir, args.prefix,
+        iqtree=args.iqtree_bin,
+        threads=args.threads,
+        per_region_trees=args.per_region_trees,
+        scheme=args.scheme,
+        min_length=args.min_length,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -26,19 +26,25 @@ Notes:
   - This script generates a TNT run-file (tnt_script_<prefix>.run) in the working directory and runs TNT < tnt_script.run.
 """
 import argparse
+import re
 import subprocess
 import time
+from itertools import islice
 from pathlib import Path
 from Bio import SeqIO, Phylo
+from Bio.SeqIO.FastaIO import SimpleFastaParser
 
 def run(cmd, cwd=None, env=None):
     print(f"RUN: {cmd}")
     subprocess.run(cmd, shell=True, check=True, cwd=cwd, env=env)
 
-def write_tnt_nexus_from_fasta(fasta_path: Path, nexus_out: Path):
+def load_alignment(fasta_path: Path):
     seqs = list(SeqIO.parse(str(fasta_path), "fasta"))
     if not seqs:
         raise SystemExit("No sequences found in alignment.")
+    return seqs
+
+def write_tnt_nexus(seqs, nexus_out: Path):
     seq_len = len(seqs[0].seq)
     num_taxa = len(seqs)
     with nexus_out.open("w") as f:
@@ -50,6 +56,39 @@ def write_tnt_nexus_from_fasta(fasta_path: Path, nexus_out: Path):
         f.write(";\n")
     print(f"Wrote TNT NEXUS: {nexus_out}")
 
+def write_tnt_nexus_from_fasta(fasta_path: Path, nexus_out: Path, block_size: int = 0):
+    """
+    Write the TNT xread matrix for a FASTA alignment.
+
+    With block_size > 0 the FASTA is streamed twice (dimensions, then taxa in
+    blocks of block_size) instead of being loaded; the output is identical.
+    """
+    if not block_size:
+        write_tnt_nexus(load_alignment(fasta_path), nexus_out)
+        return
+
+    num_taxa = 0
+    seq_len = None
+    with open(fasta_path) as handle:
+        for _, seq in SimpleFastaParser(handle):
+            if seq_len is None:
+                seq_len = len(seq)
+            num_taxa += 1
+    if not num_taxa:
+        raise SystemExit("No sequences found in alignment.")
+
+    with open(fasta_path) as handle, nexus_out.open("w") as f:
+        f.write("xread\n")
+        f.write(f"{seq_len} {num_taxa}\n")
+        records = SimpleFastaParser(handle)
+        while True:
+            block = list(islice(records, block_size))
+            if not block:
+                break
+            f.writelines(f"{title.split(None, 1)[0] if title else ''} {seq}\n" for title, seq in block)
+        f.write(";\n")
+    print(f"Wrote TNT NEXUS: {nexus_out}")
+
 def find_recent_tree_candidate(directory: Path, since_ts: float = 0.0):
     candidates = []
     for ext in (".nex", ".nwk", ".tre", ".treefile", ".tree"):
@@ -117,27 +156,22 @@ quit;
     print(f"Wrote TNT run-file: {runfile_path}")
     return runfile_path
 
-def main():
-    p = argparse.ArgumentParser(description="IQ-TREE2 -> TNT (embedded runfile) -> merge")
-    p.add_argument("--alignment", "-s", required=True, type=Path, help="Input MSA FASTA")
-    p.add_argument("--outdir", "-od", type=Path, default=Path("."), help="Output directory")
-    p.add_argument("--prefix", "-p", type=str, default="tree", help="Output prefix")
-    p.add_argument("--iqtree-bin", type=str, default="iqtree2", help="IQ-TREE binary (default: iqtree2)")
-    p.add_argument("--tnt-bin", type=str, default="tnt", help="TNT binary (default: tnt)")
-    p.add_argument("--tnt-max-ram", type=int, default=6000, help="mxram setting for TNT (MB)")
-    p.add_argument("--tnt-output", type=Path, default=None, help="Optional: explicit TNT output tree file")
-    p.add_argument("--threads", "-nt", type=int, default=0, help="Threads for IQ-TREE (0 = AUTO)")
-    args = p.parse_args()
+def run_tree_pipeline(alignment: Path, outdir: Path, prefix: str = "tree", iqtree: str = "iqtree2",
+                      tnt: str = "tnt", tnt_max_ram: int = 6000, tnt_output: Path = None,
+                      threads: int = 0, records=None, runner=run, block_size: int = 0):
+    """
+    Run IQ-TREE -> TNT -> merge for one alignment.
 
-    alignment = args.alignment.resolve()
-    outdir = args.outdir.resolve()
+    `records` may hold the already parsed alignment (list of SeqRecord) so it is
+    not read again for the TNT matrix; otherwise it is streamed in blocks of
+    `block_size` taxa (0 = load it). `runner` executes the external commands.
+    Returns a dict with the merged tree
+    (`tree`, Bio.Phylo), the topology-only tree (`topology`) and their paths.
+    """
+    alignment = Path(alignment).resolve()
+    outdir = Path(outdir).resolve()
     outdir.mkdir(parents=True, exist_ok=True)
-    prefix = args.prefix
-    iqtree = args.iqtree_bin
-    tnt = args.tnt_bin
-    tnt_max_ram = args.tnt_max_ram
-    tnt_output = args.tnt_output.resolve() if args.tnt_output else None
-    threads = args.threads
+    tnt_output = Path(tnt_output).resolve() if tnt_output else None
 
     if not alignment.exists():
         raise SystemExit(f"Alignment not found: {alignment}")
@@ -148,7 +182,7 @@ def main():
     nt_arg = "-nt AUTO" if threads == 0 else f"-nt {threads}"
     # -redo ensures reruns overwrite previous files
     iq_cmd = f"{iqtree} -s {alignment} -m {m_arg} -alrt 1000 {nt_arg} -pre {iq_pre} -redo"
-    run(iq_cmd, cwd=outdir)
+    runner(iq_cmd, cwd=outdir)
 
     # detect IQ-TREE output treefile
     iq_treefile = iq_pre.with_suffix(".treefile")
@@ -162,7 +196,10 @@ def main():
 
     # 2) produce TNT-friendly NEXUS
     tnt_nexus = outdir / f"{prefix}.nex"
-    write_tnt_nexus_from_fasta(alignment, tnt_nexus)
+    if records is not None:
+        write_tnt_nexus(records, tnt_nexus)
+    else:
+        write_tnt_nexus_from_fasta(alignment, tnt_nexus, block_size)
 
     # 3) create TNT input tree file (from IQ-TREE topology)
     tnt_input_tree = outdir / f"TNT_input_tree_{prefix}.nwk"
@@ -176,7 +213,7 @@ def main():
     tnt_start = time.time()
     # run TNT by redirecting the runfile into TNT; outputs will be created in outdir if TNT writes relative paths
     tnt_cmd = f"{tnt} < {tnt_runfile}"
-    run(tnt_cmd, cwd=outdir)
+    runner(tnt_cmd, cwd=outdir)
     tnt_end = time.time()
     print("TNT run completed.")
 
@@ -223,8 +260,6 @@ def main():
     Phylo.write(tree, str(topology_out), "newick")
     txt = topology_out.read_text()
 
-    import re
-
     txt = re.sub(r"\)(\d+(\.\d+)?)", ")", txt)
     txt = re.sub(r":\d*\.?\d*", "", txt)
     txt = txt.replace(" ;", ";")
@@ -237,6 +272,37 @@ def main():
 
     print(f"Topology-only tree saved to: {topology_out}\n")
 
+    return {
+        "tree": merged,
+        "tree_path": final_out,
+        "topology": Phylo.read(str(topology_out), "newick"),
+        "topology_path": topology_out,
+    }
+
+def main():
+    p = argparse.ArgumentParser(description="IQ-TREE2 -> TNT (embedded runfile) -> merge")
+    p.add_argument("--alignment", "-s", required=True, type=Path, help="Input MSA FASTA")
+    p.add_argument("--outdir", "-od", type=Path, default=Path("."), help="Output directory")
+    p.add_argument("--prefix", "-p", type=str, default="tree", help="Output prefix")
+    p.add_argument("--iqtree-bin", type=str, default="iqtree2", help="IQ-TREE binary (default: iqtree2)")
+    p.add_argument("--tnt-bin", type=str, default="tnt", help="TNT binary (default: tnt)")
+    p.add_argument("--tnt-max-ram", type=int, default=6000, help="mxram setting for TNT (MB)")
+    p.add_argument("--tnt-output", type=Path, default=None, help="Optional: explicit TNT output tree file")
+    p.add_argument("--threads", "-nt", type=int, default=0, help="Threads for IQ-TREE (0 = AUTO)")
+    p.add_argument("--block-size", type=int, default=0,
+                   help="Stream the alignment in blocks of this many taxa for the TNT matrix (0 = load it)")
+    args = p.parse_args()
+
+    run_tree_pipeline(
+        args.alignment, args.outdir, args.prefix,
+        iqtree=args.iqtree_bin,
+        tnt=args.tnt_bin,
+        tnt_max_ram=args.tnt_max_ram,
+        tnt_output=args.tnt_output,
+        threads=args.threads,
+        block_size=args.block_size,
+    )
+
 
 if __name__ == "__main__":
     main()
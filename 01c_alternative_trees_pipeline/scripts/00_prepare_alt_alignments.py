@@ -1,34 +1,163 @@
+#!/usr/bin/env python3
+import argparse
+import os
+from contextlib import ExitStack
+from pathlib import Path
 from Bio import SeqIO
+from Bio.Nexus.Nexus import safename
+from Bio.SeqIO.FastaIO import SimpleFastaParser
 from Bio.Seq import Seq
 from Bio.SeqRecord import SeqRecord
 from Bio.Align import MultipleSeqAlignment
-import os
 
-input_fasta = "/home/hugo/hpc_flavirecomb/01b_tree_pipeline/data/alignment.fasta"
-output_dir = "/home/hugo/hpc_flavirecomb/01c_alternative_trees_pipeline/results"
-os.makedirs(output_dir, exist_ok=True)
-
-sequences = list(SeqIO.parse(input_fasta, "fasta"))
-
-for seq in sequences:
-    seq_id_safe = seq.id.replace(".", "_")
-    
-    output_nexus = os.path.join(output_dir, f"alternative_alignment_{seq_id_safe}_removed.nexus")
-    
-    filtered_seqs = [s for s in sequences if s.id != seq.id]
-    
-    dna_seqs = [
-        SeqRecord(
-            Seq(str(s.seq)),
-            id=s.id.replace(".", "_"),           # safe ID
-            description="",
-            annotations={"molecule_type": "DNA"}
-        )
-        for s in filtered_seqs
-    ]
-    
-    alignment = MultipleSeqAlignment(dna_seqs, annotations={"molecule_type": "DNA"})
-    
-    SeqIO.write(alignment, output_nexus, "nexus")
-
-print(f"Generated {len(sequences)} alternative NEXUS alignments in {output_dir}")
+SCRIPT_DIR = Path(__file__).resolve().parent
+BASE = SCRIPT_DIR.parent.parent
+
+input_fasta = BASE / "01b_tree_pipeline" / "data" / "alignment.fasta"
+output_dir = BASE / "01c_alternative_trees_pipeline" / "results"
+
+# Bio.AlignIO.NexusIO interleaves alignments longer than this, 70 columns per block
+INTERLEAVE_COLUMNS = 1000
+INTERLEAVE_BLOCK = 70
+
+
+def load_alignment(fasta_path):
+    return list(SeqIO.parse(str(fasta_path), "fasta"))
+
+
+def prepare_alt_alignments(sequences, output_dir):
+    """
+    Write one leave-one-out NEXUS alignment per taxon.
+
+    Returns {taxon id: NEXUS path}.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    written = {}
+
+    for seq in sequences:
+        seq_id_safe = seq.id.replace(".", "_")
+
+        output_nexus = os.path.join(output_dir, f"alternative_alignment_{seq_id_safe}_removed.nexus")
+
+        filtered_seqs = [s for s in sequences if s.id != seq.id]
+
+        dna_seqs = [
+            SeqRecord(
+                Seq(str(s.seq)),
+                id=s.id.replace(".", "_"),           # safe ID
+                description="",
+                annotations={"molecule_type": "DNA"}
+            )
+            for s in filtered_seqs
+        ]
+
+        alignment = MultipleSeqAlignment(dna_seqs, annotations={"molecule_type": "DNA"})
+
+        SeqIO.write(alignment, output_nexus, "nexus")
+        written[seq.id] = Path(output_nexus)
+
+    return written
+
+
+def _fasta_records(fasta_path):
+    with open(fasta_path) as handle:
+        for title, seq in SimpleFastaParser(handle):
+            yield (title.split(None, 1)[0] if title else ""), seq
+
+
+def prepare_alt_alignments_chunked(fasta_path, output_dir, block_size=50):
+    """
+    Same NEXUS files as prepare_alt_alignments, without loading the alignment.
+
+    The leave-one-out files are written `block_size` at a time: each block
+    keeps that many output files open and streams the FASTA once, so peak
+    memory is one record. Bio.Nexus writes alignments longer than
+    INTERLEAVE_COLUMNS interleaved; since every matrix line has a fixed
+    length, each chunk of a record is written straight to its offset.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    # pass 1: taxa, safe names and nchar only
+    ids, names, lengths = [], [], []
+    for seq_id, seq in _fasta_records(fasta_path):
+        ids.append(seq_id)
+        names.append(safename(seq_id.replace(".", "_")).encode("ascii"))
+        lengths.append(len(seq))
+    if len(ids) < 2:
+        return {}
+
+    ntax = len(ids) - 1
+    widest = sorted(range(len(ids)), key=lambda i: len(names[i]), reverse=True)[:2]
+    written = {}
+
+    for start in range(0, len(ids), block_size):
+        block = range(start, min(start + block_size, len(ids)))
+        with ExitStack() as stack:
+            files = {}
+            for i in block:
+                path = os.path.join(output_dir, f"alternative_alignment_{ids[i].replace('.', '_')}_removed.nexus")
+                handle = stack.enter_context(open(path, "wb"))
+                width = len(names[widest[1] if i == widest[0] else widest[0]])
+                nchar = lengths[1] if i == 0 else lengths[0]
+                interleave = nchar > INTERLEAVE_COLUMNS
+                handle.write((
+                    "#NEXUS\nbegin data;\n"
+                    f"dimensions ntax={ntax} nchar={nchar};\n"
+                    f"format datatype=dna missing=? gap=-{' interleave' if interleave else ''};\n"
+                    "matrix\n"
+                ).encode("ascii"))
+
+                chunks = None
+                if interleave:
+                    # (column offset, chunk length, byte offset of the block)
+                    chunks = []
+                    offset = handle.tell()
+                    for seek in range(0, nchar, INTERLEAVE_BLOCK):
+                        size = min(INTERLEAVE_BLOCK, nchar - seek)
+                        chunks.append((seek, size, offset))
+                        offset += ntax * (width + 2 + size) + 1
+                        handle.seek(offset - 1)
+                        handle.write(b"\n")
+                files[i] = (handle, width, chunks)
+                written[ids[i]] = Path(path)
+
+            # pass 2: each record goes to every open file except its own
+            for j, (seq_id, seq) in enumerate(_fasta_records(fasta_path)):
+                data = seq.encode("ascii")
+                for i, (handle, width, chunks) in files.items():
+                    if i == j:
+                        continue
+                    label = names[j].ljust(width + 1)
+                    if chunks is None:
+                        handle.write(label + data + b"\n")
+                        continue
+                    row = j if j < i else j - 1
+                    for seek, size, offset in chunks:
+                        handle.seek(offset + row * (width + 2 + size))
+                        handle.write(label + data[seek:seek + size] + b"\n")
+
+            for handle, _, _ in files.values():
+                handle.seek(0, os.SEEK_END)
+                handle.write(b";\nend;\n")
+
+    return written
+
+
+def main():
+    p = argparse.ArgumentParser(description="Write leave-one-out NEXUS alignments")
+    p.add_argument("--alignment", type=Path, default=input_fasta, help="Input MSA FASTA")
+    p.add_argument("--outdir", type=Path, default=output_dir, help="Output directory")
+    p.add_argument("--block-size", type=int, default=0,
+                   help="Write this many alignments per streaming pass instead of loading the FASTA (0 = off)")
+    args = p.parse_args()
+
+    if args.block_size:
+        written = prepare_alt_alignments_chunked(args.alignment, args.outdir, args.block_size)
+    else:
+        written = prepare_alt_alignments(load_alignment(args.alignment), args.outdir)
+
+    print(f"Generated {len(written)} alternative NEXUS alignments in {args.outdir}")
+
+
+if __name__ == "__main__":
+    main()
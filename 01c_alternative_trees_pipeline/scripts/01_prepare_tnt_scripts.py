@@ -1,12 +1,15 @@
-from Bio import SeqIO
+#!/usr/bin/env python3
+import argparse
 import os
+from pathlib import Path
+from Bio import SeqIO
 
-input_fasta = "/home/hugo/hpc_flavirecomb/01b_tree_pipeline/data/alignment.fasta"
-alternative_alignments_dir = "/home/hugo/hpc_flavirecomb/01c_alternative_trees_pipeline/results"
-tnt_scripts_dir = alternative_alignments_dir
-os.makedirs(tnt_scripts_dir, exist_ok=True)
+SCRIPT_DIR = Path(__file__).resolve().parent
+BASE = SCRIPT_DIR.parent.parent
 
-sequence_ids = [seq.id for seq in SeqIO.parse(input_fasta, "fasta")]
+input_fasta = BASE / "01b_tree_pipeline" / "data" / "alignment.fasta"
+alternative_alignments_dir = BASE / "01c_alternative_trees_pipeline" / "results"
+tnt_scripts_dir = alternative_alignments_dir
 
 tnt_template = """log tnt_{terminal}.log ;
 sect : slack 10 ;
@@ -31,30 +34,102 @@ CLS ;
 quit ;
 """
 
-count = 0
-for terminal in sequence_ids:
-    terminal_safe = terminal.replace(".", "_").replace("-", "_")
+# One short search of the adaptive mode (tnt_adaptive.py): new seed each
+# round, MPTs saved per round and pooled in Python.
+tnt_round_template = """log {log_file} ;
+sect : slack 10 ;
+mxram 2000 ;
+nstates dna ;
+taxname +100 ;
+proc {alignment_file} ;
+hold 10000 ;
+rseed {seed} ;
+xmult = level 3 chklevel 5 hits {hits} rep {rep} ;
+best ;
+length ;
+tsave {mpts_file} ;
+taxname = ;
+save ;
+tsave / ;
+quit ;
+"""
+
 
-    alignment_file_nexus = os.path.join(
+def alignment_path(alternative_alignments_dir, terminal_safe):
+    return os.path.join(
         alternative_alignments_dir,
         f"alternative_alignment_{terminal_safe}_removed.nexus"
     )
 
-    if not os.path.isfile(alignment_file_nexus):
-        print(f"Warning: Nexus file not found for {terminal}: {alignment_file_nexus}")
-        continue
 
-    alignment_file_nexus = os.path.abspath(alignment_file_nexus).strip()
+def write_round_script(path, terminal_safe, alignment_file, round_no, hits=10, rep=100):
+    """
+    Write the run-file of one adaptive search round.
 
-    script_content = tnt_template.format(
-        terminal=terminal_safe,
-        alignment_file=alignment_file_nexus
+    Returns (log file, MPT file) names, relative to the directory TNT runs in.
+    """
+    log_file = f"tnt_{terminal_safe}_r{round_no}.log"
+    mpts_file = f"round_{terminal_safe}_r{round_no}.tnt"
+    script_content = tnt_round_template.format(
+        log_file=log_file,
+        alignment_file=os.path.abspath(alignment_file),
+        seed=round_no,
+        hits=hits,
+        rep=rep,
+        mpts_file=mpts_file,
     )
-
-    script_path = os.path.join(tnt_scripts_dir, f"script_{terminal_safe}.RUN")
-    with open(script_path, "w", newline="\n") as f:
+    with open(path, "w", newline="\n") as f:
         f.write(script_content)
+    return log_file, mpts_file
+
+
+def prepare_tnt_scripts(sequence_ids, alternative_alignments_dir, tnt_scripts_dir):
+    """
+    Write one TNT run-file per leave-one-out alignment.
+
+    Returns the list of run-file paths written.
+    """
+    os.makedirs(tnt_scripts_dir, exist_ok=True)
+    written = []
+
+    for terminal in sequence_ids:
+        terminal_safe = terminal.replace(".", "_").replace("-", "_")
+
+        alignment_file_nexus = alignment_path(alternative_alignments_dir, terminal_safe)
+
+        if not os.path.isfile(alignment_file_nexus):
+            print(f"Warning: Nexus file not found for {terminal}: {alignment_file_nexus}")
+            continue
+
+        alignment_file_nexus = os.path.abspath(alignment_file_nexus).strip()
+
+        script_content = tnt_template.format(
+            terminal=terminal_safe,
+            alignment_file=alignment_file_nexus
+        )
+
+        script_path = os.path.join(tnt_scripts_dir, f"script_{terminal_safe}.RUN")
+        with open(script_path, "w", newline="\n") as f:
+            f.write(script_content)
+
+        written.append(Path(script_path))
+
+    return written
+
+
+def main():
+    p = argparse.ArgumentParser(description="Write TNT run-files for the leave-one-out alignments")
+    p.add_argument("--alignment", type=Path, default=input_fasta, help="Input MSA FASTA")
+    p.add_argument("--alignments-dir", type=Path, default=alternative_alignments_dir,
+                   help="Directory with the leave-one-out NEXUS alignments")
+    p.add_argument("--outdir", type=Path, default=tnt_scripts_dir, help="TNT scripts directory")
+    args = p.parse_args()
+
+    sequence_ids = [seq.id for seq in SeqIO.parse(str(args.alignment), "fasta")]
+    written = prepare_tnt_scripts(sequence_ids, args.alignments_dir, args.outdir)
+
+    print(f"Generated {len(written)} TNT scripts in {args.outdir}")
 
-    count += 1
 
-print(f"Generated {count} TNT scripts in {tnt_scripts_dir}")
+if __name__ == "__main__":
+    main()
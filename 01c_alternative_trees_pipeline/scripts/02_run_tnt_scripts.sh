@@ -1,7 +1,9 @@
 #!/bin/bash
-TNT_SCRIPTS_DIR="/home/hugo/hpc_flavirecomb/01c_alternative_trees_pipeline/results"
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 
-TNT_EXEC="/home/hugo/Downloads/TNT-bin/tnt"
+TNT_SCRIPTS_DIR="${1:-${SCRIPT_DIR}/../results}"
+
+TNT_EXEC="${2:-${TNT_EXEC:-tnt}}"
 
 for tnt_script in "$TNT_SCRIPTS_DIR"/script_*.RUN; do
     echo "Running TNT script: $tnt_script"
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import os
 import re
+import sys
 
 def convert_tnt_to_newick(content):
     """Apply TNT → Newick conversion rules."""
@@ -15,41 +16,60 @@ def convert_tnt_to_newick(content):
 
 
 def process_tnt_file(filename):
-    """Process a single TNT file."""
+    """Process a single TNT file, writing consensus_<name>.tre next to it."""
     with open(filename, "r") as infile:
         lines = infile.readlines()
 
     if len(lines) < 3:
         print(f"⚠️ File too short, skipping: {filename}")
-        return
+        return None
 
     inner = ''.join(lines[1:-1])
     newick = convert_tnt_to_newick(inner)
-    base = os.path.splitext(filename)[0]
+    directory, name = os.path.split(filename)
+    base = os.path.splitext(name)[0]
     clean_base = re.sub(r"^consensus_", "", base)
-    output_filename = f"consensus_{clean_base}.tre"
+    output_filename = os.path.join(directory, f"consensus_{clean_base}.tre")
 
     with open(output_filename, "w") as outfile:
         outfile.write(newick + "\n")
 
     print(f"Converted: {filename} → {output_filename}")
+    return output_filename
+
+
+def convert_trees(directory="."):
+    """
+    Convert every consensus*.tnt in `directory` to Newick.
+
+    Returns {output .tre path: Newick string}.
+    """
+    files = sorted(
+        f for f in os.listdir(directory) if f.startswith("consensus") and f.endswith(".tnt")
+    )
+
+    converted = {}
+    for f in files:
+        output_filename = process_tnt_file(os.path.join(directory, f))
+        if output_filename:
+            with open(output_filename) as tre:
+                converted[output_filename] = tre.read().strip()
+
+    return converted
 
 
 def main():
     print("=== Converting TNT Trees to Newick Format ===")
 
-    files = [f for f in os.listdir(".") if f.startswith("consensus") and f.endswith(".tnt")]
+    directory = sys.argv[1] if len(sys.argv) > 1 else "."
+    converted = convert_trees(directory)
 
-    if not files:
+    if not converted:
         print("No .tnt files found in this directory.")
         return
 
-    for f in files:
-        process_tnt_file(f)
-
     print("=== Conversion Completed ===")
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Consensus trees from the TNT most-parsimonious trees (mpts_<taxon>.tnt).
+
+Trees are streamed one at a time and every non-trivial group is counted in a
+{bitset: count} table (bit i = i-th taxon of the first tree), so the MPT file
+is never held in memory. From the counts we get, per leave-one-out run:
+
+  strict_<taxon>.tre     groups present in all MPTs (same as TNT `nelsen *`)
+  majority_<taxon>.tre   groups present in more than half of the MPTs
+  extended_<taxon>.tre   majority groups + compatible minority groups (greedy)
+  splits_<taxon>.csv     every group with its count and frequency
+
+With a reference tree (--reference, or the IQ-TREE topology in the workflow)
+each run also gives support_<taxon>.tre: the reference without the removed
+taxon, every internal node labelled with the frequency of its group among the
+MPTs of that run.
+
+Internal nodes of the Newick outputs are labelled with the group frequency.
+TNT trees are rooted on the outgroup, so groups are counted as rooted clades,
+as `nelsen` does.
+"""
+import argparse
+import copy
+import csv
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from Bio import Phylo
+
+CHUNK_SIZE = 1 << 16
+
+
+def _tokens(handle):
+    """Yield TNT tree tokens: '(', ')', '*', ';' and taxon labels."""
+    label = []
+    in_quote = False
+    while True:
+        chunk = handle.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        for ch in chunk:
+            if in_quote:
+                in_quote = ch != "'"
+                continue
+            if ch == "'":
+                in_quote = True
+            elif ch in "()*;,\n\r\t ":
+                if label:
+                    yield "".join(label)
+                    label = []
+                if ch in "()*;":
+                    yield ch
+            else:
+                label.append(ch)
+    if label:
+        yield "".join(label)
+
+
+def read_tnt_trees(path):
+    """
+    Stream the trees of a TNT tree file as nested tuples of leaf labels.
+
+    Handles the `tread 'comment'` header, `*` separators and the closing `;`.
+    """
+    with open(path) as handle:
+        stack = []
+        for tok in _tokens(handle):
+            if tok == "(":
+                stack.append([])
+            elif tok == ")":
+                if not stack:
+                    raise ValueError(f"Unbalanced ')' in {path}")
+                node = tuple(stack.pop())
+                if stack:
+                    stack[-1].append(node)
+                else:
+                    yield node
+            elif tok in "*;":
+                continue
+            elif stack:
+                stack[-1].append(tok)
+            # labels outside a tree (tread, proc-, ...) are commands: skip
+
+
+def leaves(node):
+    if isinstance(node, str):
+        yield node
+    else:
+        for child in node:
+            yield from leaves(child)
+
+
+def _groups(node, index, out):
+    """Collect the bitset of every internal node; returns the node's bitset."""
+    if isinstance(node, str):
+        try:
+            return 1 << index[node]
+        except KeyError:
+            raise ValueError(f"Taxon {node!r} is not in the first tree") from None
+    bits = 0
+    for child in node:
+        bits |= _groups(child, index, out)
+    out.append(bits)
+    return bits
+
+
+def tree_groups(tree, index):
+    """Frozenset of the non-trivial group bitsets of one tree."""
+    groups = []
+    full = _groups(tree, index, groups)
+    return frozenset(bits for bits in groups if bits != full and bits & (bits - 1))
+
+
+def format_tnt_tree(node):
+    """Nested-tuple tree back to TNT parenthetical notation."""
+    if isinstance(node, str):
+        return node
+    return "(" + " ".join(format_tnt_tree(child) for child in node) + " )"
+
+
+def write_tnt_trees(path, trees, comment="trees"):
+    """Write trees as a TNT tree file (same layout `tsave` produces)."""
+    with open(path, "w", newline="\n") as f:
+        f.write(f"tread '{comment}'\n")
+        f.write("*\n".join(format_tnt_tree(tree) for tree in trees))
+        f.write(";\nproc-;\n")
+
+
+def count_groups(trees, taxa=None):
+    """
+    Count the non-trivial groups over an iterable of trees.
+
+    `taxa` maps TNT taxon numbers to names (trees saved without `taxname =`).
+    Returns (taxon names, {bitset: count}, number of trees).
+    """
+    names = None
+    index = None
+    full = 0
+    counts = {}
+    n_trees = 0
+
+    for tree in trees:
+        if names is None:
+            names = list(leaves(tree))
+            index = {name: i for i, name in enumerate(names)}
+            full = (1 << len(names)) - 1
+        groups = []
+        _groups(tree, index, groups)
+        for bits in set(groups):
+            if bits != full and bits & (bits - 1):
+                counts[bits] = counts.get(bits, 0) + 1
+        n_trees += 1
+
+    if names is None:
+        return [], {}, 0
+    if taxa is not None:
+        names = [taxa[int(n)] if n.isdigit() else n for n in names]
+    return names, counts, n_trees
+
+
+def _compatible(a, b):
+    return a & b == 0 or a & b == a or a & b == b
+
+
+def strict_groups(counts, n_trees):
+    return {bits: c for bits, c in counts.items() if c == n_trees}
+
+
+def majority_groups(counts, n_trees):
+    return {bits: c for bits, c in counts.items() if 2 * c > n_trees}
+
+
+def extended_majority_groups(counts, n_trees):
+    """Greedy consensus: add groups by decreasing frequency if compatible."""
+    chosen = {}
+    order = sorted(counts.items(), key=lambda item: (-item[1], bin(item[0]).count("1"), item[0]))
+    for bits, c in order:
+        if all(_compatible(bits, other) for other in chosen):
+            chosen[bits] = c
+    return chosen
+
+
+def to_newick(names, groups, n_trees, labels=True):
+    """Build a Newick string from compatible groups, labelled with frequencies."""
+    full = (1 << len(names)) - 1
+    # children of each group = largest groups nested in it; leaves fill the rest
+    nodes = sorted(groups, key=lambda bits: bin(bits).count("1"))
+    children = {bits: [] for bits in nodes}
+    children[full] = []
+    for i, bits in enumerate(nodes):
+        parent = next((p for p in nodes[i + 1:] if bits & p == bits), full)
+        children[parent].append(bits)
+
+    def render(bits):
+        covered = 0
+        parts = []
+        for child in children[bits]:
+            covered |= child
+            parts.append(render(child))
+        rest = bits & ~covered
+        parts.extend(names[i] for i in range(len(names)) if rest >> i & 1)
+        label = "" if bits == full or not labels else f"{groups[bits] / n_trees:.2f}"
+        return f"({','.join(parts)}){label}"
+
+    return render(full) + ";"
+
+
+def write_splits(path, names, counts, n_trees):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["taxa", "size", "count", "frequency"])
+        for bits, c in sorted(counts.items(), key=lambda item: (-item[1], item[0])):
+            members = [names[i] for i in range(len(names)) if bits >> i & 1]
+            writer.writerow([" ".join(members), len(members), c, f"{c / n_trees:.4f}"])
+
+
+def consensus_file(mpts_path, out_dir=None, taxa=None):
+    """
+    Compute strict / majority / extended-majority consensus for one MPT file.
+
+    Returns a dict with the taxon names, group counts, number of trees and the
+    Newick strings (`strict`, `majority`, `extended`).
+    """
+    mpts_path = Path(mpts_path)
+    out_dir = Path(out_dir) if out_dir else mpts_path.parent
+    out_dir.mkdir(parents=True, exist_ok=True)
+    terminal = re.sub(r"^mpts_", "", mpts_path.stem)
+
+    names, counts, n_trees = count_groups(read_tnt_trees(mpts_path), taxa)
+    if not n_trees:
+        print(f"Warning: no trees in {mpts_path}")
+        return None
+
+    result = {"terminal": terminal, "names": names, "counts": counts, "n_trees": n_trees}
+    for kind, select in (("strict", strict_groups),
+                         ("majority", majority_groups),
+                         ("extended", extended_majority_groups)):
+        newick = to_newick(names, select(counts, n_trees), n_trees)
+        (out_dir / f"{kind}_{terminal}.tre").write_text(newick + "\n")
+        result[kind] = newick
+
+    write_splits(out_dir / f"splits_{terminal}.csv", names, counts, n_trees)
+    print(f"Consensus of {n_trees} MPTs: {mpts_path.name}")
+    return result
+
+
+def consensus_all(directory, out_dir=None, workers=None):
+    """Run consensus_file on every mpts_*.tnt in `directory`, in parallel."""
+    files = sorted(Path(directory).glob("mpts_*.tnt"))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(consensus_file, files, [out_dir] * len(files))
+        return {r["terminal"]: r for r in results if r}
+
+
+def tnt_name(name):
+    """Taxon name as the leave-one-out run-files spell it (01_prepare_tnt_scripts)."""
+    return name.replace(".", "_").replace("-", "_")
+
+
+def match_names(tree, names):
+    """
+    {reference leaf name: MPT taxon name}. A leaf matches as is, with `.` -> `_`
+    (the NEXUS ids of 00_prepare_alt_alignments) or with `.`/`-` -> `_`.
+    """
+    known = set(names)
+    mapping = {}
+    for leaf in tree.get_terminals():
+        for candidate in (leaf.name, leaf.name.replace(".", "_"), tnt_name(leaf.name)):
+            if candidate in known:
+                mapping[leaf.name] = candidate
+                break
+    return mapping
+
+
+def annotate_support(tree, names, counts, n_trees, name_map=None):
+    """
+    Set clade.confidence on a Bio.Phylo tree to the frequency of each of its
+    groups among the MPTs (0.0 when absent). Returns the tree.
+
+    `name_map` maps leaf names to MPT taxon names (see match_names). The
+    reference may be rooted elsewhere than the TNT outgroup, so a clade also
+    matches the complementary group (same split).
+    """
+    name_map = name_map or {}
+    index = {name: i for i, name in enumerate(names)}
+    full = (1 << len(names)) - 1
+    for clade in tree.get_nonterminals():
+        bits = 0
+        for leaf in clade.get_terminals():
+            name = name_map.get(leaf.name, leaf.name)
+            if name in index:
+                bits |= 1 << index[name]
+        if bits == full:
+            clade.confidence = None
+            continue
+        clade.confidence = max(counts.get(bits, 0), counts.get(full ^ bits, 0)) / n_trees
+    return tree
+
+
+def support_trees(reference, results, out_dir):
+    """
+    Annotate the reference topology with the split frequencies of every
+    leave-one-out run (results of consensus_all) and write support_<taxon>.tre.
+
+    Reference leaves keep their names; only the removed taxon is pruned. Any
+    other leaf or MPT taxon without a counterpart is an error.
+    Returns {terminal: Bio.Phylo tree}.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    trees = {}
+    for terminal, r in results.items():
+        tree = copy.deepcopy(reference)
+        name_map = match_names(tree, r["names"])
+        unmatched = [leaf for leaf in tree.get_terminals() if leaf.name not in name_map]
+        removed = [leaf for leaf in unmatched if tnt_name(leaf.name) == tnt_name(terminal)]
+        extra = [leaf.name for leaf in unmatched if leaf not in removed]
+        missing = sorted(set(r["names"]) - set(name_map.values()))
+        if extra or missing:
+            raise ValueError(
+                f"Reference and mpts_{terminal}.tnt do not have the same taxa: "
+                f"not in the MPTs: {', '.join(extra) or '-'}; not in the reference: {', '.join(missing) or '-'}"
+            )
+        for leaf in removed:
+            tree.prune(leaf)
+        annotate_support(tree, r["names"], r["counts"], r["n_trees"], name_map)
+        Phylo.write(tree, str(out_dir / f"support_{terminal}.tre"), "newick")
+        trees[terminal] = tree
+    return trees
+
+
+def main():
+    p = argparse.ArgumentParser(description="Consensus trees and split frequencies from TNT MPT files")
+    p.add_argument("directory", nargs="?", default=".", help="Directory with mpts_*.tnt")
+    p.add_argument("--outdir", default=None, help="Output directory (default: same as input)")
+    p.add_argument("--workers", type=int, default=os.cpu_count(), help="Parallel processes")
+    p.add_argument("--reference", default=None,
+                   help="Reference Newick (e.g. topology_final.nwk) to annotate with the split frequencies")
+    args = p.parse_args()
+
+    print("=== Computing consensus trees ===")
+    results = consensus_all(args.directory, args.outdir, args.workers)
+    if not results:
+        print("No mpts_*.tnt files found in this directory.")
+        return
+    print(f"=== Consensus computed for {len(results)} runs ===")
+
+    if args.reference:
+        reference = Phylo.read(args.reference, "newick")
+        support_trees(reference, results, args.outdir or args.directory)
+        print(f"=== Support trees written for {len(results)} runs ===")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,79 @@
 #!/usr/bin/env python3
+import argparse
+import importlib
 import subprocess
+from pathlib import Path
 
-BASE = "/home/hugo/hpc_flavirecomb"
+SCRIPT_DIR = Path(__file__).resolve().parent
+BASE = SCRIPT_DIR.parent.parent
 
-def run(cmd):
+alt_alignments = importlib.import_module("00_prepare_alt_alignments")
+tnt_scripts = importlib.import_module("01_prepare_tnt_scripts")
+convert = importlib.import_module("03_convert_trees")
+consensus = importlib.import_module("04_consensus")
+tnt_adaptive = importlib.import_module("tnt_adaptive")
+
+RESULTS_DIR = BASE / "01c_alternative_trees_pipeline" / "results"
+
+def run(cmd, cwd=None, timeout=None):
     print(f"\n=== Running: {cmd} ===")
-    subprocess.run(cmd, shell=True, check=True)
+    subprocess.run(cmd, shell=True, check=True, cwd=cwd, timeout=timeout)
+
+def run_tnt_scripts(script_paths, tnt_bin="tnt", workdir=SCRIPT_DIR, runner=run):
+    """Run each TNT run-file; TNT writes its logs/trees relative to workdir."""
+    for tnt_script in script_paths:
+        runner(f"{tnt_bin} < {Path(tnt_script).resolve()}", cwd=workdir)
+
+def run_alt_trees_pipeline(sequences, results_dir=RESULTS_DIR, tnt_bin="tnt", workdir=SCRIPT_DIR,
+                           runner=run, alignment_file=None, block_size=0, adaptive=False, **adaptive_options):
+    """
+    Run the leave-one-out TNT searches in-process.
+
+    `sequences` is the already parsed alignment (list of SeqRecord); with
+    block_size > 0 it may be None and `alignment_file` is streamed instead.
+    With adaptive=True the fixed TNT search is replaced by tnt_adaptive rounds
+    (`adaptive_options` go to tnt_adaptive.adaptive_search). Returns the converted consensus trees as {.tre path: Newick string}.
+    """
+    if block_size:
+        written = alt_alignments.prepare_alt_alignments_chunked(alignment_file, results_dir, block_size)
+    else:
+        written = alt_alignments.prepare_alt_alignments(sequences, results_dir)
+    if adaptive:
+        tnt_adaptive.run_adaptive_searches(list(written), results_dir, results_dir, workdir, tnt_bin, runner,
+                                           **adaptive_options)
+        return {
+            str(tre): tre.read_text().strip()
+            for tre in sorted(Path(workdir).glob("consensus_*.tre"))
+        }
+
+    scripts = tnt_scripts.prepare_tnt_scripts(list(written), results_dir, results_dir)
+    run_tnt_scripts(scripts, tnt_bin, workdir, runner)
+    return convert.convert_trees(workdir)
 
 def main():
+    p = argparse.ArgumentParser(description="Alternative (leave-one-out) trees pipeline")
+    p.add_argument("--alignment", type=Path, default=alt_alignments.input_fasta, help="Input MSA FASTA")
+    p.add_argument("--results", type=Path, default=RESULTS_DIR, help="Results directory")
+    p.add_argument("--tnt-bin", type=str, default="tnt", help="TNT binary (default: tnt)")
+    p.add_argument("--block-size", type=int, default=0,
+                   help="Stream the alignment, writing this many leave-one-out files per pass (0 = load it)")
+    p.add_argument("--adaptive", action="store_true",
+                   help="Search in short TNT rounds until length and strict consensus are stable")
+    p.add_argument("--stable-rounds", type=int, default=tnt_adaptive.STABLE_ROUNDS,
+                   help="Adaptive mode: rounds without change before stopping")
+    p.add_argument("--wall-budget", type=float, default=None, help="Adaptive mode: wall-time budget per taxon (s)")
+    args = p.parse_args()
+
     print("=== 02 Alternative Trees Pipeline ===")
 
-    run(f"python3 {BASE}/01c_alternative_trees_pipeline/scripts/00_prepare_alt_alignments.py")
-    run(f"python3 {BASE}/01c_alternative_trees_pipeline/scripts/01_prepare_tnt_scripts.py")
-    run(f"bash {BASE}/01c_alternative_trees_pipeline/scripts/02_run_tnt_scripts.sh")
-    run(f"python3 {BASE}/01c_alternative_trees_pipeline/scripts/03_convert_trees.py")
-    
+    sequences = None if args.block_size else alt_alignments.load_alignment(args.alignment)
+    run_alt_trees_pipeline(sequences, args.results, args.tnt_bin,
+                           alignment_file=args.alignment, block_size=args.block_size,
+                           adaptive=args.adaptive, stable_rounds=args.stable_rounds,
+                           wall_budget=args.wall_budget)
+    consensus.consensus_all(SCRIPT_DIR)
+
     print("\n=== 02 Alternative Trees Pipeline Completed ===")
 
 if __name__ == "__main__":
     main()
-
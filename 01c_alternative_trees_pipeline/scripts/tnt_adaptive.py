@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Adaptive leave-one-out TNT searches.
+
+Instead of one fixed `xmult ... hits 100 rep 1000` per taxon, each taxon is
+searched in short rounds (new random seed each round). After every round the
+best length is read from the TNT log and the MPTs at that length are pooled
+(duplicates removed). The search stops once both the best length and the
+strict consensus of the pool have not changed for `stable_rounds` rounds, or
+when the per-job wall-time budget would be exceeded. A round still running when
+the budget runs out is killed (the remaining budget, capped by the per-command
+timeout, is the runner's timeout). A taxon that ends without any MPT leaves no
+mpts_/consensus_ file, so older ones are removed.
+
+Per taxon this leaves, in the TNT working directory:
+
+  mpts_<taxon>.tnt       pooled MPTs (TNT tree file, read by 04_consensus)
+  consensus_<taxon>.tre  strict consensus in Newick (read by compare_trees)
+  tnt_<taxon>_r<n>.log   TNT log of each round
+
+Round run-files (round_<taxon>_r<n>.RUN, kept apart from the script_*.RUN of
+the fixed search) and round MPT files are removed once read.
+
+and adaptive_summary.csv (rounds used, final length, converged, seconds).
+"""
+import argparse
+import csv
+import importlib
+import os
+import re
+import subprocess
+import time
+from pathlib import Path
+from Bio import SeqIO
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+BASE = SCRIPT_DIR.parent.parent
+
+tnt_scripts = importlib.import_module("01_prepare_tnt_scripts")
+consensus = importlib.import_module("04_consensus")
+
+RESULTS_DIR = BASE / "01c_alternative_trees_pipeline" / "results"
+
+STABLE_ROUNDS = 3
+MAX_ROUNDS = 50
+ROUND_HITS = 10
+ROUND_REP = 100
+
+BEST_SCORE = re.compile(r"Best score[^:\n]*:\s*(\d+)")
+
+
+def run(cmd, cwd=None, timeout=None):
+    print(f"\n=== Running: {cmd} ===")
+    subprocess.run(cmd, shell=True, check=True, cwd=cwd, timeout=timeout)
+
+
+def read_best_length(log_path):
+    """
+    Best tree length reported in a TNT log: the last "Best score" line, or
+    the smallest value of the `length` table.
+    """
+    text = Path(log_path).read_text(errors="replace")
+    scores = BEST_SCORE.findall(text)
+    if scores:
+        return int(scores[-1])
+
+    lengths = []
+    lines = text.splitlines()
+    for i, line in enumerate(lines):
+        if "Tree lengths" in line:
+            for row in lines[i + 1:]:
+                tokens = row.split()
+                if not tokens:
+                    if lengths:
+                        break
+                    continue
+                if tokens[0].isdigit() and all(t.isdigit() for t in tokens):
+                    lengths.extend(int(t) for t in tokens[1:])
+    if not lengths:
+        raise ValueError(f"No tree length found in {log_path}")
+    return min(lengths)
+
+
+def adaptive_search(terminal, alignment_file, scripts_dir, workdir=SCRIPT_DIR, tnt_bin="tnt",
+                    runner=run, stable_rounds=STABLE_ROUNDS, max_rounds=MAX_ROUNDS,
+                    hits=ROUND_HITS, rep=ROUND_REP, wall_budget=None, command_timeout=None):
+    """
+    Search one leave-one-out alignment until length and strict consensus are
+    stable. `wall_budget` is in seconds; what is left of it, capped by
+    `command_timeout` (the workflow's --timeout), is passed on to `runner` as
+    the timeout of each round. Returns the per-taxon summary row.
+    """
+    terminal_safe = terminal.replace(".", "_").replace("-", "_")
+    workdir = Path(workdir)
+    start = time.time()
+
+    index = None
+    pool = {}
+    best = None
+    strict = None
+    stable = 0
+    converged = False
+    rounds = 0
+
+    for round_no in range(1, max_rounds + 1):
+        script = Path(scripts_dir) / f"round_{terminal_safe}_r{round_no}.RUN"
+        log_file, mpts_file = tnt_scripts.write_round_script(
+            script, terminal_safe, alignment_file, round_no, hits, rep
+        )
+        limits = [t for t in (command_timeout,) if t is not None]
+        if wall_budget is not None:
+            limits.append(max(wall_budget - (time.time() - start), 1.0))
+        timeout = {"timeout": min(limits)} if limits else {}
+        try:
+            runner(f"{tnt_bin} < {script.resolve()}", cwd=workdir, **timeout)
+        except (subprocess.TimeoutExpired, RuntimeError):
+            # the workflow runner raises RuntimeError on timeout as well
+            if wall_budget is None or time.time() - start < wall_budget:
+                raise
+            print(f"{terminal}: wall-time budget reached during round {round_no}")
+            if (workdir / mpts_file).exists():
+                os.remove(workdir / mpts_file)
+            break
+        finally:
+            os.remove(script)
+        rounds = round_no
+
+        length = read_best_length(workdir / log_file)
+        improved = best is None or length < best
+        if improved:
+            best = length
+            pool = {}
+        if length == best:
+            for tree in consensus.read_tnt_trees(workdir / mpts_file):
+                if index is None:
+                    index = {name: i for i, name in enumerate(consensus.leaves(tree))}
+                pool.setdefault(consensus.tree_groups(tree, index), tree)
+        os.remove(workdir / mpts_file)
+
+        new_strict = frozenset.intersection(*pool) if pool else frozenset()
+        stable = 0 if improved or new_strict != strict else stable + 1
+        strict = new_strict
+        print(f"{terminal}: round {round_no}, length {length}, best {best}, "
+              f"{len(pool)} MPTs, stable for {stable} round(s)")
+
+        if stable >= stable_rounds:
+            converged = True
+            break
+        elapsed = time.time() - start
+        if wall_budget is not None and elapsed + elapsed / round_no > wall_budget:
+            print(f"{terminal}: wall-time budget reached after {round_no} rounds")
+            break
+
+    if not pool:
+        # no MPTs: drop outputs of an earlier run so they are not taken for this one
+        for stale in (workdir / f"mpts_{terminal_safe}.tnt", workdir / f"consensus_{terminal_safe}.tre"):
+            if stale.exists():
+                os.remove(stale)
+    else:
+        consensus.write_tnt_trees(workdir / f"mpts_{terminal_safe}.tnt", pool.values(),
+                                  comment=f"adaptive search, {rounds} rounds, length {best}")
+        names = [None] * len(index)
+        for name, i in index.items():
+            names[i] = name
+        newick = consensus.to_newick(names, {bits: 1 for bits in strict}, 1, labels=False)
+        (workdir / f"consensus_{terminal_safe}.tre").write_text(newick + "\n")
+
+    return {
+        "Terminal": terminal,
+        "Rounds": rounds,
+        "Length": best,
+        "MPTs": len(pool),
+        "Converged": converged,
+        "Seconds": round(time.time() - start, 1),
+    }
+
+
+def write_summary(rows, output_file):
+    output_file = Path(output_file)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["Terminal", "Rounds", "Length", "MPTs", "Converged", "Seconds"])
+        writer.writeheader()
+        writer.writerows(rows)
+    return output_file
+
+
+def run_adaptive_searches(sequence_ids, alignments_dir=RESULTS_DIR, scripts_dir=RESULTS_DIR,
+                          workdir=SCRIPT_DIR, tnt_bin="tnt", runner=run, **options):
+    """Adaptive search for every taxon with a leave-one-out alignment."""
+    rows = []
+    for terminal in sequence_ids:
+        terminal_safe = terminal.replace(".", "_").replace("-", "_")
+        alignment_file = tnt_scripts.alignment_path(alignments_dir, terminal_safe)
+        if not os.path.isfile(alignment_file):
+            print(f"Warning: Nexus file not found for {terminal}: {alignment_file}")
+            continue
+        rows.append(adaptive_search(terminal, alignment_file, scripts_dir, workdir, tnt_bin, runner, **options))
+
+    write_summary(rows, Path(scripts_dir) / "adaptive_summary.csv")
+    return rows
+
+
+def main():
+    p = argparse.ArgumentParser(description="Adaptive (convergence-based) leave-one-out TNT searches")
+    p.add_argument("--alignment", type=Path, default=tnt_scripts.input_fasta, help="Input MSA FASTA (taxon list)")
+    p.add_argument("--alignments-dir", type=Path, default=RESULTS_DIR,
+                   help="Directory with the leave-one-out NEXUS alignments")
+    p.add_argument("--workdir", type=Path, default=SCRIPT_DIR, help="Directory TNT runs in")
+    p.add_argument("--tnt-bin", type=str, default="tnt", help="TNT binary (default: tnt)")
+    p.add_argument("--stable-rounds", type=int, default=STABLE_ROUNDS,
+                   help="Stop after this many rounds without change in length or strict consensus")
+    p.add_argument("--max-rounds", type=int, default=MAX_ROUNDS, help="Hard limit on rounds per taxon")
+    p.add_argument("--hits", type=int, default=ROUND_HITS, help="xmult hits per round")
+    p.add_argument("--rep", type=int, default=ROUND_REP, help="xmult replications per round")
+    p.add_argument("--wall-budget", type=float, default=None, help="Wall-time budget per taxon (seconds)")
+    args = p.parse_args()
+
+    sequence_ids = [seq.id for seq in SeqIO.parse(str(args.alignment), "fasta")]
+    rows = run_adaptive_searches(
+        sequence_ids, args.alignments_dir, args.alignments_dir, args.workdir, args.tnt_bin,
+        stable_rounds=args.stable_rounds, max_rounds=args.max_rounds,
+        hits=args.hits, rep=args.rep, wall_budget=args.wall_budget,
+    )
+
+    print(f"Adaptive searches done for {len(rows)} taxa")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,36 @@
 #!/usr/bin/env python3
+import argparse
 import os
 import subprocess
+from pathlib import Path
 
-BASE = "/home/hugo/hpc_flavirecomb"
+BASE = str(Path(__file__).resolve().parent.parent)
 
 FINAL_TREE = f"{BASE}/01b_tree_pipeline/scripts/topology_final.nwk"
 ALT_TREES_DIR = f"{BASE}/01c_alternative_trees_pipeline/scripts"
 OUTPUT_DIR = f"{BASE}/02_comp_trees_pipeline/results"
-YBYRA = "/home/hugo/ybyra/ybyra_sa.py"
-
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+YBYRA = os.environ.get("YBYRA", "/home/hugo/ybyra/ybyra_sa.py")
 
 def run(cmd):
     print(f"\n=== Running: {cmd} ===")
     subprocess.run(cmd, shell=True, check=True)
 
-def main():
-    print("=== 03 Compare Trees Pipeline ===")
-
-    consensus_files = [
-        f for f in os.listdir(ALT_TREES_DIR)
-        if f.startswith("consensus_") and f.endswith(".tre")
-    ]
-
-    if not consensus_files:
-        print("ERROR: No consensus*.tre files found in alternative trees directory.")
-        return
-
+def write_configs(final_tree, alt_tree_paths, output_dir=OUTPUT_DIR):
+    """Write one YBYRÁ config per alternative tree; returns the config paths."""
+    os.makedirs(output_dir, exist_ok=True)
     config_files = []
 
-    for idx, treefile in enumerate(consensus_files, start=1):
+    for idx, alt_tree_path in enumerate(alt_tree_paths, start=1):
 
-        alt_tree_path = os.path.join(ALT_TREES_DIR, treefile)
-        config_path = os.path.join(OUTPUT_DIR, f"config_{idx}.txt")
+        config_path = os.path.join(output_dir, f"config_{idx}.txt")
 
         config_content = f""">id = calculating_topological_distances
 <begin files
-    {FINAL_TREE} ;
+    {final_tree} ;
     {alt_tree_path} ;
 end files>
 
->n = 1 {FINAL_TREE} ] 
+>n = 1 {final_tree} ] 
 >opt = 3
 >compare = 0
 >verbose
@@ -51,12 +41,41 @@ end files>
 
         config_files.append(config_path)
 
+    return config_files
+
+def compare_trees(final_tree, alt_tree_paths, output_dir=OUTPUT_DIR, ybyra=YBYRA, runner=run):
+    """Run YBYRÁ comparing final_tree against each alternative tree."""
+    config_files = write_configs(final_tree, alt_tree_paths, output_dir)
+
     for cfg in config_files:
         print(f"\nRunning comparison for: {cfg}")
-        run(f"python3 {YBYRA} -d -f {cfg}")
+        runner(f"python3 {ybyra} -d -f {cfg}")
+
+    return config_files
+
+def main():
+    p = argparse.ArgumentParser(description="Compare the final tree against the alternative trees (YBYRÁ)")
+    p.add_argument("--final-tree", default=FINAL_TREE, help="Topology-only final tree")
+    p.add_argument("--alt-trees-dir", default=ALT_TREES_DIR, help="Directory with consensus_*.tre")
+    p.add_argument("--outdir", default=OUTPUT_DIR, help="Output directory")
+    p.add_argument("--ybyra", default=YBYRA, help="Path to ybyra_sa.py")
+    args = p.parse_args()
+
+    print("=== 03 Compare Trees Pipeline ===")
+
+    consensus_files = [
+        f for f in os.listdir(args.alt_trees_dir)
+        if f.startswith("consensus_") and f.endswith(".tre")
+    ]
+
+    if not consensus_files:
+        print("ERROR: No consensus*.tre files found in alternative trees directory.")
+        return
+
+    alt_tree_paths = [os.path.join(args.alt_trees_dir, f) for f in consensus_files]
+    compare_trees(args.final_tree, alt_tree_paths, args.outdir, args.ybyra)
 
     print("\n=== 03 Compare Trees Pipeline Completed ===")
 
 if __name__ == "__main__":
     main()
-
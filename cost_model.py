@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Runtime cost model behind `hpc_flavirecomb.py --plan`.
+
+Each stage is modelled as `jobs x per-job work`, with one time coefficient
+(seconds per work unit) and one memory overhead (MB per job) per stage:
+
+  stage               jobs              work per job                  memory per job
+  tree                1 (IQ-TREE+TNT)   taxa * patterns * log2(taxa)  IQ-TREE partial likelihoods
+  tree_regions        1 (partitioned)   as tree                       as tree
+  alt_trees           taxa (TNT LOO)    taxa^2 * informative sites    TNT matrix + held trees (<= mxram)
+  alt_trees_adaptive  taxa              as alt_trees                  as alt_trees
+  snps                3 * events        1 + alignment length / 10 kb  snipit (python + plots)
+  compare             taxa (YBYRÁ)      taxa^2                        small
+
+The coefficients start from the PRIORS below and are recalibrated from the
+stage timings every workflow run appends to logs/runs.csv (and from any
+benchmark CSVs in the same format): the median observed/predicted ratio per
+stage replaces the prior.
+
+run_workflow runs IQ-TREE with --threads and every other job one after the
+other, so the plan predicts that. The TNT / SNP pool sizes are advice for the
+parallel paths (02_run_tnt_scripts.sh as a job array, snp_pipeline_pycompss.py),
+with the wall time those pools would give.
+"""
+import csv
+import math
+from pathlib import Path
+import numpy as np
+from Bio.SeqIO.FastaIO import SimpleFastaParser
+
+HISTORY_FIELDS = ["stage", "taxa", "length", "variable", "informative", "events",
+                  "jobs", "workers", "seconds", "peak_mb"]
+
+# seconds per work unit, MB overhead per job
+PRIORS = {
+    "tree": {"seconds": 1e-3, "memory_mb": 100.0},
+    "tree_regions": {"seconds": 1e-3, "memory_mb": 100.0},
+    "alt_trees": {"seconds": 2e-5, "memory_mb": 20.0},
+    "alt_trees_adaptive": {"seconds": 1e-5, "memory_mb": 20.0},
+    "snps": {"seconds": 15.0, "memory_mb": 250.0},
+    "compare": {"seconds": 2e-3, "memory_mb": 100.0},
+}
+
+IQTREE_STAGES = ("tree", "tree_regions")
+
+# IQ-TREE: serial fraction for Amdahl's law, and patterns a thread needs to be useful
+IQTREE_SERIAL_FRACTION = 0.1
+PATTERNS_PER_THREAD = 500
+# mxram of the leave-one-out TNT template (01_prepare_tnt_scripts.py)
+TNT_MXRAM_MB = 2000
+
+BASES = np.full(256, -1, dtype=np.int8)
+BASES[np.frombuffer(b"ACGT", dtype=np.uint8)] = np.arange(4)
+
+
+def site_features(sequences, events):
+    """
+    Taxa, columns, variable and parsimony-informative sites (ACGT only) of
+    aligned sequence strings, plus the event count. Sequences are consumed
+    one at a time.
+    """
+    counts = None
+    taxa = 0
+    for seq in sequences:
+        codes = BASES[np.frombuffer(seq.upper().encode("ascii"), dtype=np.uint8)]
+        if counts is None:
+            counts = np.zeros((codes.size, 4), dtype=np.int32)
+        n = min(codes.size, counts.shape[0])
+        for k in range(4):
+            counts[:n, k] += codes[:n] == k
+        taxa += 1
+    if counts is None:
+        raise SystemExit("No sequences found in alignment.")
+
+    return {
+        "taxa": taxa,
+        "length": counts.shape[0],
+        "variable": int(((counts >= 1).sum(axis=1) >= 2).sum()),
+        "informative": int(((counts >= 2).sum(axis=1) >= 2).sum()),
+        "events": events,
+    }
+
+
+def dataset_features(alignment_file, table_file):
+    """site_features of an alignment FASTA (streamed) and an event table."""
+    with open(table_file, newline="") as f:
+        events = sum(1 for _ in csv.DictReader(f))
+    with open(alignment_file) as handle:
+        return site_features((seq for _, seq in SimpleFastaParser(handle)), events)
+
+
+def features_from_records(records, events):
+    """site_features of SeqRecords already in memory and the loaded event rows."""
+    return site_features((str(rec.seq) for rec in records), len(events))
+
+
+def iqtree_speedup(threads):
+    return 1.0 / (IQTREE_SERIAL_FRACTION + (1.0 - IQTREE_SERIAL_FRACTION) / threads)
+
+
+def stage_shape(stage, f):
+    """(jobs, work per job, base memory MB per job) of a stage for features f."""
+    taxa = max(f["taxa"], 2)
+    patterns = f["variable"] + 4
+    if stage in IQTREE_STAGES:
+        # partial likelihood vectors: ~2 * taxa nodes x patterns x 4 states x 4 rates x 8 bytes
+        memory = 2 * taxa * patterns * 4 * 4 * 8 / 1e6
+        return 1, taxa * patterns * math.log2(taxa), memory
+    if stage in ("alt_trees", "alt_trees_adaptive"):
+        memory = min(TNT_MXRAM_MB, taxa * f["length"] / 1e6 + 10000 * taxa * 16 / 1e6)
+        return taxa, taxa ** 2 * max(f["informative"], 1), memory
+    if stage == "snps":
+        return 3 * f["events"], 1.0 + f["length"] / 1e4, 3 * f["length"] / 1e6
+    if stage == "compare":
+        return taxa, taxa ** 2, 0.0
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def read_history(paths):
+    rows = []
+    for path in paths:
+        if Path(path).exists():
+            with open(path, newline="") as f:
+                rows.extend(csv.DictReader(f))
+    return rows
+
+
+def record_stage(history_file, stage, features, seconds, jobs, workers, peak_mb=None):
+    """Append one stage timing to the run history used for calibration."""
+    history_file = Path(history_file)
+    history_file.parent.mkdir(parents=True, exist_ok=True)
+    new = not history_file.exists()
+    with open(history_file, "a", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=HISTORY_FIELDS)
+        if new:
+            writer.writeheader()
+        writer.writerow({
+            "stage": stage, **{k: features[k] for k in ("taxa", "length", "variable", "informative", "events")},
+            "jobs": jobs, "workers": workers, "seconds": f"{seconds:.1f}",
+            "peak_mb": "" if peak_mb is None else f"{peak_mb:.0f}",
+        })
+
+
+def calibrate(history):
+    """
+    Per-stage coefficients: the prior, replaced by the median observed/predicted
+    ratio over the recorded runs of that stage.
+    """
+    coefficients = {stage: dict(prior, runs=0) for stage, prior in PRIORS.items()}
+    by_stage = {}
+    for row in history:
+        by_stage.setdefault(row["stage"], []).append(row)
+
+    for stage, rows in by_stage.items():
+        if stage not in coefficients:
+            continue
+        time_ratios, memory_ratios = [], []
+        for row in rows:
+            f = {k: int(float(row[k])) for k in ("taxa", "length", "variable", "informative", "events")}
+            jobs, work, memory = stage_shape(stage, f)
+            workers = max(int(float(row["workers"] or 1)), 1)
+            seconds = float(row["seconds"])
+            if stage in IQTREE_STAGES:
+                cpu_equivalent = seconds * iqtree_speedup(workers)
+            else:
+                cpu_equivalent = seconds * workers
+            if jobs and work:
+                time_ratios.append(cpu_equivalent / (jobs * work))
+            if row.get("peak_mb"):
+                memory_ratios.append(float(row["peak_mb"]) - memory)
+        if time_ratios:
+            coefficients[stage]["seconds"] = float(np.median(time_ratios))
+            coefficients[stage]["runs"] = len(time_ratios)
+        if memory_ratios:
+            coefficients[stage]["memory_mb"] = max(float(np.median(memory_ratios)), 0.0)
+    return coefficients
+
+
+def auto_threads(features, cores):
+    """
+    IQ-TREE threads for the data: one per PATTERNS_PER_THREAD patterns, within
+    `cores`. Also taken as what `-nt AUTO` (--threads 0) ends up using.
+    """
+    patterns = features["variable"] + 4
+    return max(1, min(cores, patterns // PATTERNS_PER_THREAD))
+
+
+def recommend_workers(features, coefficients, cores, memory_gb, tnt_stage="alt_trees"):
+    """IQ-TREE -nt and TNT / snipit pool sizes for a core and memory budget."""
+    memory_mb = memory_gb * 1024
+    workers = {"iqtree": auto_threads(features, cores)}
+    for key, stage in (("tnt", tnt_stage), ("snps", "snps")):
+        jobs, _, memory = stage_shape(stage, features)
+        per_job = memory + coefficients[stage]["memory_mb"]
+        by_memory = max(1, int(memory_mb // per_job)) if per_job > 0 else cores
+        workers[key] = max(1, min(cores, by_memory, jobs or 1))
+    return workers
+
+
+def job_seconds(stage, features, coefficients, tnt_wall_budget=None):
+    jobs, work, memory = stage_shape(stage, features)
+    seconds = coefficients[stage]["seconds"] * work
+    if stage == "alt_trees_adaptive" and tnt_wall_budget is not None:
+        seconds = min(seconds, tnt_wall_budget)
+    return jobs, seconds, memory + coefficients[stage]["memory_mb"]
+
+
+def plan(features, coefficients, cores, memory_gb, threads=8, partitioned=False, adaptive=False,
+         tnt_wall_budget=None):
+    """
+    Predicted wall time, CPU hours and peak memory per stage of run_workflow
+    with these options (IQ-TREE on `threads`, everything else serial), plus
+    the recommended IQ-TREE threads and TNT / SNP pool sizes for the budget.
+    threads=0 is IQ-TREE's -nt AUTO, planned as auto_threads(features, cores).
+    """
+    threads_auto = not threads
+    if threads_auto:
+        threads = auto_threads(features, cores)
+    tnt_stage = "alt_trees_adaptive" if adaptive else "alt_trees"
+    names = ["tree"] + (["tree_regions"] if partitioned else []) + [tnt_stage, "snps", "compare"]
+
+    stages = {}
+    for stage in names:
+        jobs, seconds, peak = job_seconds(stage, features, coefficients, tnt_wall_budget)
+        if stage in IQTREE_STAGES:
+            wall = seconds / iqtree_speedup(threads)
+            cpu = wall * threads
+        else:
+            wall = cpu = jobs * seconds
+        stages[stage] = {
+            "jobs": jobs,
+            "workers": threads if stage in IQTREE_STAGES else 1,
+            "wall_hours": wall / 3600,
+            "cpu_hours": cpu / 3600,
+            "peak_memory_gb": peak / 1024,
+            "calibration_runs": coefficients[stage]["runs"],
+        }
+
+    workers = recommend_workers(features, coefficients, cores, memory_gb, tnt_stage)
+    _, iq_seconds, _ = job_seconds("tree", features, coefficients)
+    recommended = {
+        "iqtree_threads": workers["iqtree"],
+        "iqtree_wall_hours": iq_seconds / iqtree_speedup(workers["iqtree"]) / 3600,
+    }
+    for key, stage in (("tnt", tnt_stage), ("snp", "snps")):
+        jobs, seconds, peak = job_seconds(stage, features, coefficients, tnt_wall_budget)
+        pool = workers["tnt" if key == "tnt" else "snps"]
+        recommended[f"{key}_pool"] = pool
+        recommended[f"{key}_wall_hours"] = math.ceil(jobs / pool) * seconds / 3600 if jobs else 0.0
+        recommended[f"{key}_peak_memory_gb"] = pool * peak / 1024
+
+    return {
+        "features": features,
+        "threads": threads,
+        "threads_auto": threads_auto,
+        "stages": stages,
+        "total_wall_hours": sum(s["wall_hours"] for s in stages.values()),
+        "total_cpu_hours": sum(s["cpu_hours"] for s in stages.values()),
+        "peak_memory_gb": max(s["peak_memory_gb"] for s in stages.values()),
+        "recommended": recommended,
+    }
+
+
+def format_plan(result, cores, memory_gb):
+    f = result["features"]
+    lines = [
+        f"Dataset: {f['taxa']} taxa, {f['length']} columns, {f['variable']} variable / "
+        f"{f['informative']} informative sites, {f['events']} events",
+        "",
+        f"hpc_flavirecomb.py as run (IQ-TREE -nt {'AUTO, ~' if result['threads_auto'] else ''}"
+        f"{result['threads']}, other jobs one at a time):",
+        f"{'stage':<19} {'jobs':>6} {'wall (h)':>10} {'CPU (h)':>10} {'peak (GB)':>10} {'calib.':>7}",
+    ]
+    for stage, s in result["stages"].items():
+        lines.append(
+            f"{stage:<19} {s['jobs']:>6} {s['wall_hours']:>10.2f} "
+            f"{s['cpu_hours']:>10.2f} {s['peak_memory_gb']:>10.2f} {s['calibration_runs']:>7}"
+        )
+    r = result["recommended"]
+    lines += [
+        f"Total: {result['total_wall_hours']:.2f} h wall, {result['total_cpu_hours']:.2f} CPU h, "
+        f"{result['peak_memory_gb']:.2f} GB peak",
+        "(calib. = recorded runs behind each estimate; 0 means the built-in prior)",
+        "",
+        f"Recommended for {cores} cores, {memory_gb:g} GB:",
+        f"  IQ-TREE --threads {r['iqtree_threads']}: {r['iqtree_wall_hours']:.2f} h wall",
+        f"  TNT pool {r['tnt_pool']} (02_run_tnt_scripts.sh as a job array): "
+        f"{r['tnt_wall_hours']:.2f} h wall, {r['tnt_peak_memory_gb']:.2f} GB",
+        f"  SNP pool {r['snp_pool']} (snp_pipeline_pycompss.py): "
+        f"{r['snp_wall_hours']:.2f} h wall, {r['snp_peak_memory_gb']:.2f} GB",
+    ]
+    return "\n".join(lines)
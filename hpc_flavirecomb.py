@@ -1,102 +1,412 @@
 #!/usr/bin/env python3
-import subprocess
+import argparse
+import asyncio
+import collections
+import functools
+import importlib
+import json
+import os
+import re
+import resource
+import signal
 import sys
+import time
 from pathlib import Path
 
-def run(cmd, cwd=None, log=None):
-    """Run a command, print it, and optionally log output."""
+import cost_model
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+
+TREE_PIPE_DIR = PROJECT_ROOT / "01b_tree_pipeline" / "scripts"
+ALT_PIPE_DIR = PROJECT_ROOT / "01c_alternative_trees_pipeline" / "scripts"
+SNP_PIPE_DIR = PROJECT_ROOT / "01a_snp_pipeline" / "scripts"
+COMP_PIPE_DIR = PROJECT_ROOT / "02_comp_trees_pipeline"
+
+
+LOG_DIR = PROJECT_ROOT / "logs"
+STATUS_FILE = LOG_DIR / "status.json"
+# Stage timings of every run; --plan calibrates the cost model on them.
+RUN_HISTORY = LOG_DIR / "runs.csv"
+PLAN_FILE = LOG_DIR / "plan.json"
+
+# Tail kept in memory per command (for error reports); everything else goes
+# straight to the stage log.
+TAIL_LINES = 200
+# Each tail entry is cut to this many characters, so the tail stays within
+# TAIL_LINES * TAIL_LINE_CHARS whatever the line length.
+TAIL_LINE_CHARS = 4096
+# Longest line handed to the log/tail in one piece; TNT prints whole trees on
+# one line. Longer lines are passed on in LINE_LIMIT pieces.
+LINE_LIMIT = 1 << 20
+CHUNK_SIZE = 1 << 16
+
+# Progress lines from the tools we drive: (key, regex); the first group is stored.
+PROGRESS_PATTERNS = [
+    # IQ-TREE
+    ("iqtree_models_total", re.compile(r"ModelFinder will test up to (\d+)")),
+    ("iqtree_models_done", re.compile(r"^\s*(\d+)\s+\S+\s+\d+\.\d+\s+\d+\s+\d+\.\d+")),
+    ("iqtree_best_model", re.compile(r"Best-fit model: (\S+)")),
+    ("iqtree_phase", re.compile(r"^\|\s+([A-Z][A-Z /-]+?)\s+\|$")),
+    ("iqtree_iteration", re.compile(r"^Iteration (\d+) / LogL")),
+    ("iqtree_best_logl", re.compile(r"BEST SCORE FOUND : (-?\d+\.\d+)")),
+    ("iqtree_threads", re.compile(r"BEST NUMBER OF THREADS: (\d+)")),
+    # TNT
+    ("tnt_replication", re.compile(r"^\s*(\d+)\s+[A-Z]+\s+\S+\s+(?:\d+|-+)\s+(?:\d+|-+)\s+\d+:\d\d:\d\d")),
+    ("tnt_best_score", re.compile(r"Best score(?: \(\w+\))?:\s*(\d+)")),
+    ("tnt_hits", re.compile(r"Best score hit (\d+) times")),
+]
+
+
+def parse_progress(line, progress):
+    """Update `progress` from one tool output line; returns True if it changed."""
+    changed = False
+    for key, pattern in PROGRESS_PATTERNS:
+        m = pattern.search(line)
+        if m and progress.get(key) != m.group(1):
+            progress[key] = m.group(1)
+            changed = True
+    return changed
+
+
+class WorkflowStatus:
+    """Live per-stage status, rewritten to a small JSON file as progress moves."""
+
+    def __init__(self, path=STATUS_FILE, min_interval=1.0):
+        self.path = Path(path)
+        self.min_interval = min_interval
+        self.stages = {}
+        self._last_write = 0.0
+
+    def stage(self, name):
+        return self.stages.setdefault(name, {"state": "pending", "commands_done": 0, "progress": {}})
+
+    def finish(self, name):
+        self.stage(name)["state"] = "done"
+        self.write(force=True)
+
+    def write(self, force=False):
+        now = time.time()
+        if not force and now - self._last_write < self.min_interval:
+            return
+        self._last_write = now
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"updated": now, "stages": self.stages}, indent=2))
+        tmp.replace(self.path)
+
+
+async def _stream(cmd, cwd, on_line, timeout):
+    proc = await asyncio.create_subprocess_shell(
+        cmd, cwd=cwd,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+        start_new_session=True,
+    )
+
+    async def pump():
+        # readline() drops the buffered data of a line longer than its limit,
+        # so split the raw chunks ourselves; a line longer than LINE_LIMIT is
+        # passed on in LINE_LIMIT pieces instead of being lost
+        buffer = b""
+        while True:
+            chunk = await proc.stdout.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            buffer += chunk
+            lines = buffer.split(b"\n")
+            buffer = lines.pop()
+            for line in lines:
+                on_line(line.decode(errors="replace") + "\n")
+            while len(buffer) >= LINE_LIMIT:
+                on_line(buffer[:LINE_LIMIT].decode(errors="replace"))
+                buffer = buffer[LINE_LIMIT:]
+        if buffer:
+            on_line(buffer.decode(errors="replace"))
+        return await proc.wait()
+
+    try:
+        return await asyncio.wait_for(pump(), timeout)
+    except asyncio.TimeoutError:
+        os.killpg(proc.pid, signal.SIGKILL)
+        await proc.wait()
+        raise
+
+
+def run(cmd, cwd=None, log=None, stage="workflow", timeout=None, status=None):
+    """
+    Run a command, streaming its output line by line.
+
+    Output is teed to the console and to logs/<stage>.log; progress from known
+    tools goes to `status` (a WorkflowStatus). Only the last TAIL_LINES lines
+    (each cut to TAIL_LINE_CHARS) are kept in memory and returned. `timeout`
+    is in seconds.
+    """
     print(f"\n=== Running: {cmd} ===\n")
-    result = subprocess.run(cmd, shell=True, cwd=cwd, capture_output=True, text=True)
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    stage_log_path = LOG_DIR / f"{stage}.log"
+    tail = collections.deque(maxlen=TAIL_LINES)
+    stage_status = status.stage(stage) if status else None
 
     if log:
         log.write(f"\n--- COMMAND: {cmd} ---\n")
-        log.write(result.stdout)
-        log.write(result.stderr)
+        log.write(f"(output in {stage_log_path})\n")
+        log.flush()
 
-    if result.returncode != 0:
-        print(result.stderr)
+    if stage_status is not None:
+        stage_status.update(state="running", command=cmd)
+        status.write(force=True)
+
+    with open(stage_log_path, "a", buffering=1) as stage_log:
+        stage_log.write(f"\n--- COMMAND: {cmd} ---\n")
+
+        def on_line(line):
+            stage_log.write(line)
+            sys.stdout.write(line)
+            if len(line) > TAIL_LINE_CHARS:
+                line_tail = line[:TAIL_LINE_CHARS] + f" ... [{len(line) - TAIL_LINE_CHARS} chars cut]\n"
+            else:
+                line_tail = line
+            tail.append(line_tail)
+            if stage_status is not None and parse_progress(line, stage_status["progress"]):
+                status.write()
+
+        try:
+            returncode = asyncio.run(_stream(cmd, cwd, on_line, timeout))
+        except asyncio.TimeoutError:
+            stage_log.write(f"--- TIMEOUT after {timeout}s ---\n")
+            if stage_status is not None:
+                stage_status["state"] = "timeout"
+                status.write(force=True)
+            raise RuntimeError(f"Command timed out after {timeout}s: {cmd}")
+
+    if stage_status is not None:
+        stage_status["commands_done"] += 1
+        stage_status["state"] = "running" if returncode == 0 else "failed"
+        status.write(force=True)
+
+    if returncode != 0:
+        if log:
+            log.writelines(tail)
         raise RuntimeError(f"Command failed: {cmd}")
 
-    return result.stdout
+    return "".join(tail)
 
 
-def main():
-    project_root = Path(__file__).resolve().parent
+def load_step(script_dir, name):
+    """Import a pipeline script (e.g. "00_auto_snipit") from its directory."""
+    script_dir = str(script_dir)
+    if script_dir not in sys.path:
+        sys.path.insert(0, script_dir)
+    return importlib.import_module(name)
 
-    TREE_PIPE = project_root / "tree_pipeline" / "scripts" / "tree_pipeline.py"
-    ALT_PIPE_DIR = project_root / "alternative_trees_pipeline" / "scripts"
-    SNP_PIPE_DIR = project_root / "snp_pipeline" / "scripts"
 
-    input_fasta = project_root / "input" / "annotated_denv_genomes_nm.fasta"
+def children_peak_mb():
+    """Largest resident set of any finished child process so far (Linux: KB)."""
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
 
-    with open(project_root / "workflow.log", "w") as LOG:
 
-        LOG.write("=== Starting Workflow ===\n")
+def run_workflow(alignment_file, input_fasta, table_file, log, threads=8, tnt_bin="tnt",
+                 timeout=None, status=None, block_size=0, adaptive_tnt=None, partitioned=None,
+                 partition_scheme="union"):
+    """
+    Run every stage in this interpreter.
+
+    The alignment, genome set and event table are parsed once here and passed
+    to the stages; returns a dict with the in-memory results of each stage.
+    With block_size > 0 neither FASTA is loaded: the stages stream or index
+    them and work on blocks of that many taxa/events. `adaptive_tnt` (dict of
+    tnt_adaptive options) switches the leave-one-out searches to adaptive rounds.
+    `partitioned` ("joint" or "per_region") adds one partitioned IQ-TREE run
+    over the recombinant / non-recombinant regions of all events, with the
+    charsets of `partition_scheme` ("union" or "event", see partitioned_iqtree).
+    """
+    tree_pipeline = load_step(TREE_PIPE_DIR, "tree_pipeline")
+    partitioned_iqtree = load_step(TREE_PIPE_DIR, "partitioned_iqtree")
+    alt_pipeline = load_step(ALT_PIPE_DIR, "alt_trees_pipeline")
+    consensus = load_step(ALT_PIPE_DIR, "04_consensus")
+    snp_pipeline = load_step(SNP_PIPE_DIR, "snp_pipeline_serial")
+    auto_snipit = load_step(SNP_PIPE_DIR, "00_auto_snipit")
+    compare = load_step(COMP_PIPE_DIR, "compare_trees")
+
+    if not alignment_file.exists():
+        raise FileNotFoundError(f"Tree alignment missing: {alignment_file}")
 
-        # 1) TREE PIPELINE (IQ-TREE → TNT input)
-        LOG.write("\n\n### TREE PIPELINE ###\n")
-        
-        alignment_file = project_root / "tree_pipeline" / "data" / "alignment.fasta"
-        tree_outdir = project_root / "tree_pipeline" / "results"
-
-        if TREE_PIPE.exists():
-            if not alignment_file.exists():
-                raise FileNotFoundError(f"Tree alignment missing: {alignment_file}")
-        
-            run(
-                f"python3 {TREE_PIPE} "
-                f"--alignment {alignment_file} "
-                f"--outdir {tree_outdir} "
-                f"--prefix mytree "
-                f"--threads 8",
-                log=LOG
-            )
+    events = auto_snipit.load_events(table_file)
+    if block_size:
+        alignment = None
+        seq_dict = auto_snipit.load_sequences(input_fasta, low_memory=True)
+    else:
+        alignment = tree_pipeline.load_alignment(alignment_file)
+        if Path(input_fasta).resolve() == Path(alignment_file).resolve():
+            seq_dict = {rec.id: rec for rec in alignment}
         else:
-            LOG.write("Tree pipeline script NOT FOUND — skipping\n")
+            seq_dict = auto_snipit.load_sequences(input_fasta)
+
+    regions = None
+    if partitioned:
+        # check the events against the alignment before any compute is spent
+        length = len(alignment[0].seq) if alignment else partitioned_iqtree.alignment_length(alignment_file)
+        regions = partitioned_iqtree.partition_regions(events, length, partition_scheme)
+
+    results = {"alignment": alignment, "events": events}
+    status = status or WorkflowStatus()
 
+    # stage timings for the cost model; the peak is only known when a stage
+    # raised the high-water mark of the child processes
+    if alignment is not None:
+        features = cost_model.features_from_records(alignment, events)
+    else:
+        features = cost_model.dataset_features(alignment_file, table_file)
+    clock = {"start": time.time(), "peak": children_peak_mb()}
 
-        # 2) ALTERNATIVE TREES PIPELINE
-        LOG.write("\n\n### ALTERNATIVE TREES PIPELINE ###\n")
+    def record(stage, jobs, workers=1):
+        peak = children_peak_mb()
+        cost_model.record_stage(RUN_HISTORY, stage, features, time.time() - clock["start"], jobs, workers,
+                                peak if peak > clock["peak"] else None)
+        clock.update(start=time.time(), peak=peak)
 
-        # 2.1 generate alt alignments
-        alt00 = ALT_PIPE_DIR / "00_prepare_alt_alignments.py"
-        if alt00.exists():
-            run(f"python3 {alt00}", log=LOG)
+    def iqtree_workers(stage):
+        # --threads 0 is -nt AUTO: the count IQ-TREE reported, else the cost model's guess
+        if threads:
+            return threads
+        chosen = status.stage(stage)["progress"].get("iqtree_threads")
+        return int(chosen) if chosen else cost_model.auto_threads(features, os.cpu_count() or 1)
 
-        # 2.2 generate TNT scripts
-        alt01 = ALT_PIPE_DIR / "01_prepare_tnt_scripts.py"
-        if alt01.exists():
-            run(f"python3 {alt01}", log=LOG)
+    def logged(stage):
+        return functools.partial(run, log=log, stage=stage, timeout=timeout, status=status)
 
-        # 2.3 run TNT batch jobs
-        alt02 = ALT_PIPE_DIR / "02_run_tnt_scripts.sh"
-        if alt02.exists():
-            alt02.chmod(0o755)
-            run(str(alt02), cwd=ALT_PIPE_DIR, log=LOG)
+    # 1) TREE PIPELINE (IQ-TREE → TNT input)
+    log.write("\n\n### TREE PIPELINE ###\n")
+    results["tree"] = tree_pipeline.run_tree_pipeline(
+        alignment_file,
+        PROJECT_ROOT / "01b_tree_pipeline" / "results",
+        prefix="mytree",
+        threads=threads,
+        tnt=tnt_bin,
+        records=alignment,
+        runner=logged("tree"),
+        block_size=block_size,
+    )
+    status.finish("tree")
+    record("tree", 1, iqtree_workers("tree"))
 
-        # 3) SNP PIPELINE
-        LOG.write("\n\n### SNP PIPELINE ###\n")
+    # 1b) PARTITIONED IQ-TREE (recombinant vs non-recombinant regions)
+    if partitioned:
+        log.write("\n\n### PARTITIONED TREE PIPELINE ###\n")
+        results["region_trees"] = partitioned_iqtree.run_partitioned_iqtree(
+            alignment_file,
+            events,
+            PROJECT_ROOT / "01b_tree_pipeline" / "results",
+            threads=threads,
+            per_region_trees=partitioned == "per_region",
+            regions=regions,
+            runner=logged("tree_regions"),
+        )
+        status.finish("tree_regions")
+        record("tree_regions", 1, iqtree_workers("tree_regions"))
 
-        # 3.1 Run Snipit automatically
-        snp00 = SNP_PIPE_DIR / "00_auto_snipit.py"
-        if snp00.exists():
-            run(f"python3 {snp00}", log=LOG)
+    # 2) ALTERNATIVE TREES PIPELINE
+    log.write("\n\n### ALTERNATIVE TREES PIPELINE ###\n")
+    if alignment is not None:
+        status.stage("alt_trees")["jobs_total"] = len(alignment)
+    # adaptive rounds get the remaining budget as timeout, still capped by --timeout
+    adaptive_options = dict(adaptive_tnt, command_timeout=timeout) if adaptive_tnt is not None else {}
+    results["alt_trees"] = alt_pipeline.run_alt_trees_pipeline(
+        alignment, tnt_bin=tnt_bin, runner=logged("alt_trees"),
+        alignment_file=alignment_file, block_size=block_size,
+        adaptive=adaptive_tnt is not None, **adaptive_options,
+    )
+    # strict / majority / extended consensus + split frequencies of the MPTs
+    results["alt_consensus"] = consensus.consensus_all(ALT_PIPE_DIR)
+    # IQ-TREE topology with the MPT split frequencies of each leave-one-out run
+    results["alt_support"] = consensus.support_trees(
+        results["tree"]["topology"], results["alt_consensus"], ALT_PIPE_DIR
+    )
+    status.finish("alt_trees")
+    record("alt_trees_adaptive" if adaptive_tnt is not None else "alt_trees", features["taxa"])
 
-        # 3.2 Snipit splitting (bash script)
-        snp01 = SNP_PIPE_DIR / "01_run_snipit.sh"
-        if snp01.exists():
-            snp01.chmod(0o755)
-            run(str(snp01), cwd=SNP_PIPE_DIR, log=LOG)
+    # 3) SNP PIPELINE
+    log.write("\n\n### SNP PIPELINE ###\n")
+    results["snps"] = snp_pipeline.run_snp_pipeline(seq_dict, events, runner=logged("snps"),
+                                                    block_size=block_size)
+    status.finish("snps")
+    record("snps", 3 * len(events))
 
-        # 3.3 Calculate SNPs
-        snp02 = SNP_PIPE_DIR / "02_calculate_snps.py"
-        if snp02.exists():
-            run(f"python3 {snp02}", log=LOG)
+    # 4) COMPARE TREES
+    log.write("\n\n### COMPARE TREES PIPELINE ###\n")
+    results["comparisons"] = compare.compare_trees(
+        str(results["tree"]["topology_path"]), sorted(results["alt_trees"]), runner=logged("compare")
+    )
+    status.finish("compare")
+    record("compare", len(results["alt_trees"]))
 
+    if block_size:
+        seq_dict.close()
+
+    return results
+
+
+def main():
+    p = argparse.ArgumentParser(description="hpc-flavirecomb workflow (single interpreter)")
+    p.add_argument("--alignment", type=Path,
+                   default=PROJECT_ROOT / "01b_tree_pipeline" / "data" / "alignment.fasta",
+                   help="MSA used for the tree and alternative-tree stages")
+    p.add_argument("--fasta", type=Path,
+                   default=PROJECT_ROOT / "00_input" / "annotated_denv_genomes_nm.fasta",
+                   help="Annotated genome FASTA used for the SNP stage")
+    p.add_argument("--table", type=Path,
+                   default=PROJECT_ROOT / "00_input" / "recomb_and_parents.csv",
+                   help="Recombination event table (CSV)")
+    p.add_argument("--threads", type=int, default=8, help="Threads for IQ-TREE")
+    p.add_argument("--tnt-bin", type=str, default="tnt", help="TNT binary (default: tnt)")
+    p.add_argument("--timeout", type=float, default=None, help="Per-command timeout in seconds")
+    p.add_argument("--block-size", type=int, default=0,
+                   help="Out-of-core mode: stream/index the FASTAs and process this many taxa per block")
+    p.add_argument("--adaptive-tnt", action="store_true",
+                   help="Leave-one-out TNT searches in short rounds until length and strict consensus are stable")
+    p.add_argument("--stable-rounds", type=int, default=3, help="Adaptive TNT: rounds without change before stopping")
+    p.add_argument("--tnt-wall-budget", type=float, default=None, help="Adaptive TNT: wall-time budget per taxon (s)")
+    p.add_argument("--partitioned", choices=["joint", "per_region"], default=None,
+                   help="Also run one partitioned IQ-TREE job over the recombinant / non-recombinant regions "
+                        "(joint tree, or one tree per region with IQ-TREE -S)")
+    p.add_argument("--partition-scheme", choices=["union", "event"], default="union",
+                   help="Charsets of --partitioned: recombinant vs non-recombinant columns, or one per event")
+    p.add_argument("--plan", action="store_true",
+                   help="Dry run: predict wall time, CPU hours and peak memory per stage and recommend "
+                        "IQ-TREE threads and TNT/SNP pool sizes for --cores / --memory-gb; runs nothing")
+    p.add_argument("--cores", type=int, default=os.cpu_count(), help="Plan: cores available")
+    p.add_argument("--memory-gb", type=float, default=16, help="Plan: memory available (GB)")
+    p.add_argument("--calibration", type=Path, nargs="*", default=[],
+                   help=f"Plan: benchmark CSVs (same columns as {RUN_HISTORY.name}) used with the recorded runs")
+    args = p.parse_args()
+
+    if args.plan:
+        features = cost_model.dataset_features(args.alignment, args.table)
+        coefficients = cost_model.calibrate(cost_model.read_history([RUN_HISTORY, *args.calibration]))
+        plan = cost_model.plan(features, coefficients, args.cores, args.memory_gb, threads=args.threads,
+                               partitioned=args.partitioned is not None, adaptive=args.adaptive_tnt,
+                               tnt_wall_budget=args.tnt_wall_budget)
+        print(cost_model.format_plan(plan, args.cores, args.memory_gb))
+        LOG_DIR.mkdir(parents=True, exist_ok=True)
+        PLAN_FILE.write_text(json.dumps(plan, indent=2))
+        print(f"\nPlan written to {PLAN_FILE}")
+        return
+
+    adaptive_tnt = None
+    if args.adaptive_tnt:
+        adaptive_tnt = {"stable_rounds": args.stable_rounds, "wall_budget": args.tnt_wall_budget}
+
+    with open(PROJECT_ROOT / "workflow.log", "w") as LOG:
+
+        LOG.write("=== Starting Workflow ===\n")
+
+        run_workflow(args.alignment, args.fasta, args.table, LOG,
+                     threads=args.threads, tnt_bin=args.tnt_bin, timeout=args.timeout,
+                     block_size=args.block_size, adaptive_tnt=adaptive_tnt,
+                     partitioned=args.partitioned, partition_scheme=args.partition_scheme)
 
         LOG.write("\n=== WORKFLOW COMPLETED SUCCESSFULLY ===\n")
 
-    print("\nSee workflow.log for details.\n")
+    print(f"\nSee workflow.log, {LOG_DIR}/<stage>.log and {STATUS_FILE} for details.\n")
 
 
 if __name__ == "__main__":
@@ -105,4 +415,3 @@ if __name__ == "__main__":
     except Exception as e:
         print("\n Execution failed:", e)
         sys.exit(1)
-
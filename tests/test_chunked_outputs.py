@@ -0,0 +1,68 @@
+import filecmp
+import importlib
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SNP_SCRIPTS = PROJECT_ROOT / "01a_snp_pipeline" / "scripts"
+TREE_SCRIPTS = PROJECT_ROOT / "01b_tree_pipeline" / "scripts"
+ALT_SCRIPTS = PROJECT_ROOT / "01c_alternative_trees_pipeline" / "scripts"
+for path in (SNP_SCRIPTS, TREE_SCRIPTS, ALT_SCRIPTS):
+    sys.path.insert(0, str(path))
+
+tree_pipeline = importlib.import_module("tree_pipeline")
+
+FASTA = PROJECT_ROOT / "00_input" / "annotated_denv_genomes_subset.fasta"
+TABLE = PROJECT_ROOT / "00_input" / "recomb_and_parents.csv"
+ALIGNMENT = PROJECT_ROOT / "01b_tree_pipeline" / "data" / "alignment.fasta"
+
+
+def assert_same_tree(a, b):
+    names_a = sorted(p.name for p in a.iterdir())
+    names_b = sorted(p.name for p in b.iterdir())
+    assert names_a and names_a == names_b
+    _, mismatch, errors = filecmp.cmpfiles(a, b, names_a, shallow=False)
+    assert not mismatch and not errors
+
+
+def run_script(script, *args):
+    subprocess.run([sys.executable, str(script), *map(str, args)], check=True, capture_output=True)
+
+
+@pytest.fixture
+def short_alignment(tmp_path):
+    # below Bio's interleave threshold, so the sequential NEXUS layout is covered too
+    path = tmp_path / "short.fasta"
+    with open(ALIGNMENT) as src, open(path, "w") as dst:
+        for line in src:
+            dst.write(line if line.startswith(">") else line.strip()[:300] + "\n")
+    return path
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 100])
+def test_fragments_chunked_cli(tmp_path, block_size):
+    script = SNP_SCRIPTS / "00_auto_snipit.py"
+    run_script(script, "--fasta", FASTA, "--table", TABLE, "--outdir", tmp_path / "memory")
+    run_script(script, "--fasta", FASTA, "--table", TABLE, "--outdir", tmp_path / "chunked",
+               "--block-size", block_size)
+    assert_same_tree(tmp_path / "memory", tmp_path / "chunked")
+
+
+@pytest.mark.parametrize("block_size", [1, 2, 100])
+def test_xread_chunked(tmp_path, block_size):
+    tree_pipeline.write_tnt_nexus_from_fasta(ALIGNMENT, tmp_path / "memory.tnt")
+    tree_pipeline.write_tnt_nexus_from_fasta(ALIGNMENT, tmp_path / "chunked.tnt", block_size)
+    assert filecmp.cmp(tmp_path / "memory.tnt", tmp_path / "chunked.tnt", shallow=False)
+
+
+@pytest.mark.parametrize("alignment", ["long", "short"])
+@pytest.mark.parametrize("block_size", [1, 2, 100])
+def test_alt_alignments_chunked_cli(tmp_path, short_alignment, alignment, block_size):
+    fasta = ALIGNMENT if alignment == "long" else short_alignment
+    script = ALT_SCRIPTS / "00_prepare_alt_alignments.py"
+    run_script(script, "--alignment", fasta, "--outdir", tmp_path / "memory")
+    run_script(script, "--alignment", fasta, "--outdir", tmp_path / "chunked", "--block-size", block_size)
+    assert_same_tree(tmp_path / "memory", tmp_path / "chunked")
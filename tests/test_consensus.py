@@ -0,0 +1,52 @@
+import importlib
+import sys
+from io import StringIO
+from pathlib import Path
+
+import pytest
+from Bio import Phylo
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "01c_alternative_trees_pipeline" / "scripts"))
+
+consensus = importlib.import_module("04_consensus")
+
+# leave-one-out run without KF887994.1: TNT names are the NEXUS ids ("." -> "_")
+MPTS = """tread 'two MPTs'
+(MZ285732_1 (OM281590_1 (GQ868602_1 (MF033260_1 AB_2))))*
+(MZ285732_1 (OM281590_1 (MF033260_1 (GQ868602_1 AB_2))));
+proc-;
+"""
+REFERENCE = "(((MF033260.1,AB-2),GQ868602.1),(KF887994.1,OM281590.1),MZ285732.1);"
+
+
+def write_run(tmp_path):
+    mpts = tmp_path / "mpts_KF887994_1.tnt"
+    mpts.write_text(MPTS)
+    return {"KF887994_1": consensus.consensus_file(mpts)}
+
+
+def test_support_trees_with_dotted_ids(tmp_path):
+    results = write_run(tmp_path)
+    reference = Phylo.read(StringIO(REFERENCE), "newick")
+
+    trees = consensus.support_trees(reference, results, tmp_path)
+
+    tree = trees["KF887994_1"]
+    names = sorted(leaf.name for leaf in tree.get_terminals())
+    assert names == ["AB-2", "GQ868602.1", "MF033260.1", "MZ285732.1", "OM281590.1"]
+    support = {
+        frozenset(leaf.name for leaf in clade.get_terminals()): clade.confidence
+        for clade in tree.get_nonterminals()
+    }
+    assert support[frozenset({"MF033260.1", "AB-2"})] == 0.5
+    assert support[frozenset({"MF033260.1", "AB-2", "GQ868602.1"})] == 1.0
+    assert (tmp_path / "support_KF887994_1.tre").exists()
+
+
+def test_support_trees_rejects_unmatched_names(tmp_path):
+    results = write_run(tmp_path)
+    reference = Phylo.read(StringIO(REFERENCE.replace("MZ285732.1", "XX000001.1")), "newick")
+
+    with pytest.raises(ValueError, match="XX000001.1"):
+        consensus.support_trees(reference, results, tmp_path)
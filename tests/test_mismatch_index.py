@@ -0,0 +1,52 @@
+import importlib
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SNP_SCRIPTS = PROJECT_ROOT / "01a_snp_pipeline" / "scripts"
+sys.path.insert(0, str(SNP_SCRIPTS))
+
+auto_snipit = importlib.import_module("00_auto_snipit")
+calculate_snps = importlib.import_module("02_calculate_snps")
+mismatch_index = importlib.import_module("mismatch_index")
+
+FASTA = PROJECT_ROOT / "00_input" / "annotated_denv_genomes_subset.fasta"
+TABLE = PROJECT_ROOT / "00_input" / "recomb_and_parents.csv"
+
+
+def test_index_lengths_match_fragments(tmp_path):
+    seq_dict = auto_snipit.load_sequences(FASTA)
+    events = auto_snipit.load_events(TABLE)
+    auto_snipit.generate_fragments(seq_dict, events, tmp_path)
+    index = mismatch_index.build_index(seq_dict, events)
+
+    skipped = 0
+    for row in events:
+        recombinant = row["Recombinant"].strip()
+        minor = row["Minor parent"].strip()
+        major = row["Major parent"].strip()
+        begin, end = int(row["Begin"]), int(row["End"])
+        base_name = f"snipit_{recombinant}_{minor}_{major}".replace("Unknown", "NA")
+        frag1 = tmp_path / f"{base_name}_frag1_{begin}_{end}.fasta"
+        frag2 = tmp_path / f"{base_name}_frag2_outside_{begin}_{end}.fasta"
+
+        _, _, rec_len, nonrec_len = mismatch_index.event_counts(index, recombinant, minor, major, begin, end)
+        if frag1.exists():
+            assert rec_len == calculate_snps.fasta_length(frag1)
+            assert nonrec_len == calculate_snps.fasta_length(frag2)
+        else:
+            skipped += 1
+            assert rec_len == 0 and nonrec_len == 0
+
+    assert skipped  # the subset FASTA lacks some recombinants
+
+
+def test_event_with_missing_recombinant_counts_zero():
+    # OM281589 (recombinant) is not in the subset, its major parent MZ285732 is
+    seq_dict = auto_snipit.load_sequences(FASTA)
+    events = auto_snipit.load_events(TABLE)
+    assert "OM281589" not in seq_dict and "MZ285732" in seq_dict
+    index = mismatch_index.build_index(seq_dict, events)
+
+    counts = mismatch_index.event_counts(index, "OM281589", "OM281590", "MZ285732", 13962, 14312)
+    assert [int(c) for c in counts] == [0, 0, 0, 0]